@@ -1,17 +1,32 @@
 from component import BaseComponent
+from container import AutoContainer
 from consts import AppCode
+from profiler import FrameProfiler, PerfHud
+from scheduler import Scheduler
+from theme import ThemeRegistry
 
 import pygame as pg
+import time
 
 class App:
     component: BaseComponent
     fps: int
 
-    def __init__(self, title, w, h):
-        pg.init()
-        self.screen = pg.display.set_mode((w, h))
+    def __init__(self, title, w, h, fps: int = 60, tps: int = 250, vsync: bool = False, trace: str|None = None,
+                 startup: float|None = None):
+        # only what is drawn with, other pygame modules are not needed
+        pg.display.init()
+        pg.font.init()
+        self.screen = pg.display.set_mode((w, h), pg.SCALED if vsync else 0, vsync=int(vsync))
         self.clock = pg.time.Clock()
-        self.fps = 25
+        self.fps = fps
+        # milliseconds per frame, uncapped (fps 0) has no deadline
+        self.budget = 1000 / fps if fps else None
+        self.scheduler = Scheduler(1000 / tps)
+        self.profiler = FrameProfiler(self.budget, trace=trace)
+        self.hud = PerfHud(self.profiler)
+        self.startup = startup
+        self.polled = 0.
 
         BaseComponent.screen = self.screen
         pg.display.set_caption(title)
@@ -21,18 +36,38 @@ class App:
 
     def run(self):
         self.component.reset()
-        counter = 0
+        self.scheduler.reset()
+        last = time.perf_counter()
 
         while True:
-            counter += 1
-            if counter % (self.fps // self.component.get_time_scaling()) == 1:
-                self.component.update()
+            self.profiler.begin()
 
-            for e in pg.event.get():
+            # logic runs in fixed steps, independent of the render rate
+            now = time.perf_counter()
+            for _ in range(self.scheduler.advance((now - last) * 1000)):
+                self.component.tick(self.scheduler.step)
+            last = now
+
+            # theme files are watched, edits show up without a restart
+            if now - self.polled >= 0.5:
+                self.polled = now
+                if ThemeRegistry.poll():
+                    self.component.set_theme(self.component.theme.source)
+            self.profiler.mark('update')
+
+            events = pg.event.get()
+            self.profiler.mark('events')
+
+            for e in events:
                 if e.type == pg.QUIT:
                     return self.quit()
                 elif e.type == pg.KEYDOWN:
+                    if e.key == pg.K_F3:
+                        self.hud.toggle()
+                        continue
+
                     r = self.component.handle_key(e.key)
+                    self.profiler.mark('keys')
                     match r:
                         case AppCode.OK:
                             break
@@ -42,16 +77,37 @@ class App:
                         case _:
                             return r
 
-            pg.display.flip()
+            self.update_display()
+            self.profiler.mark('display')
+
+            if self.startup is not None and self.profiler.frames:
+                print(f"first frame: {(time.perf_counter() - self.startup) * 1000:.1f} ms")
+                return self.quit()
             self.clock.tick(self.fps)
+            self.profiler.mark('sleep')
             self.draw()
+            self.profiler.mark('draw')
+            self.profiler.end()
 
     def quit(self) -> AppCode:
+        self.profiler.close()
+        AutoContainer.flush(timeout=5)
         pg.quit()
         return AppCode.QUIT
 
     def exit(self) -> AppCode:
         return AppCode.EXIT
 
+    def update_display(self):
+        rects = self.component.get_dirty_rects()
+        hud = self.hud.dirty()
+        if rects is None:
+            pg.display.flip()
+        elif rects or hud:
+            pg.display.update(rects + [hud] if hud else rects)
+
+        self.hud.restore(self.screen)
+
     def draw(self):
         self.component.draw()
+        self.hud.draw(self.screen)
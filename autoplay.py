@@ -0,0 +1,171 @@
+from figure import Figure, SHAPES
+from grid import Grid
+from search import MoveSearch, Placement
+
+import heapq, time
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Iterator
+
+@dataclass
+class Weights:
+    height: float = -0.510066
+    lines: float = 0.760666
+    holes: float = -0.35663
+    bumpiness: float = -0.184483
+
+# per (width, kind, rotation): for every column the figure fits in, its row masks,
+# the lowest and highest cell of each column it covers and its cells
+_drops: dict[tuple[int, int, int], dict[int, tuple]] = {}
+
+def drops(width: int, kind: int, rotation: int) -> dict[int, tuple]:
+    key = (width, kind, rotation)
+    result = _drops.get(key)
+    if result is None:
+        coords = SHAPES[kind].coords[rotation]
+        lo, hi = min(i for i, _ in coords), max(i for i, _ in coords)
+        columns = {}
+        for i, j in coords:
+            b, t = columns.get(i, (j, j))
+            columns[i] = (max(b, j), min(t, j))
+
+        result = _drops[key] = {}
+        for x in range(-lo, width - hi):
+            masks = {}
+            for i, j in coords:
+                masks[j] = masks.get(j, 0) | 1 << (x + i)
+            result[x] = (tuple(masks.items()), tuple(sorted((x + i, b, t) for i, (b, t) in columns.items())),
+                         tuple((x + i, j) for i, j in coords), min(j for _, j in coords))
+
+    return result
+
+@dataclass
+class BeamSearch:
+    width: int = 8
+    depth: int = 2
+    weights: Weights = field(default_factory=Weights)
+    budget: float|None = None
+    search: MoveSearch = field(default_factory=MoveSearch)
+    evaluations: int = 0
+
+    def __post_init__(self):
+        # the current and next figure are searched, a third level averages over every figure and ends the search
+        self.depth = min(max(self.depth, 1), 3)
+
+    def best(self, grid: Grid, figure: Figure, nextkind: int) -> Placement|None:
+        deadline = time.perf_counter() + self.budget / 1000 if self.budget is not None else None
+        self.evaluations = 0
+
+        # boards are row bitmasks with their column heights, nothing is copied from the grid per candidate
+        heights = grid.heights[:]
+        bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+        root = (0., 0., grid.occupied[:], heights, sum(heights), bumpiness, sum(heights) - grid.holes, grid.zobrist, None)
+
+        # the figure itself may tuck under overhangs, so its placements come from the move search
+        placements = self.search.placements(grid, figure)
+        moves = [(p, p.y, *drops(grid.width, figure.kind, p.rotation)[p.x]) for p in placements]
+
+        # the current and next figure are known, a third level averages over every figure that can come
+        beam = [root]
+        for d in range(self.depth):
+            if d == 2:
+                return max(beam, key=lambda node: self.expectation(grid, node, deadline))[8]
+
+            # boards reached in more than one way are only kept once, with the best value
+            candidates: dict[int, tuple] = {}
+            for node in beam:
+                for child in self.expand(grid, node, moves if d == 0 else self.dropped(grid.width, nextkind)):
+                    old = candidates.get(child[7])
+                    if old is None or old[0] < child[0]:
+                        candidates[child[7]] = child
+
+                if deadline is not None and time.perf_counter() > deadline and candidates:
+                    break
+
+            if not candidates:
+                break
+
+            beam = heapq.nlargest(self.width, candidates.values(), key=itemgetter(0))
+
+        return beam[0][8]
+
+    def expectation(self, grid: Grid, node: tuple, deadline: float|None) -> float:
+        if deadline is not None and time.perf_counter() > deadline:
+            return node[0]
+
+        values = [max(self.expand(grid, node, self.dropped(grid.width, kind), True), default=node[0] - 1000.)
+                  for kind in range(len(SHAPES))]
+        return sum(values) / len(values)
+
+    @staticmethod
+    def dropped(width: int, kind: int) -> list[tuple]:
+        # later figures are dropped straight down from above the stack
+        return [(None, None, *m) for r in range(SHAPES[kind].rotations) for m in drops(width, kind, r).values()]
+
+    def expand(self, grid: Grid, node: tuple, moves: list[tuple], leaf: bool = False) -> Iterator:
+        # children of a node, or only their values for the last level
+        _, reward, rows, heights, total, bumpiness, cells, key, first = node
+        w, h, full, table, weights = grid.width, grid.height, (1 << grid.width) - 1, grid.zobrist_table, self.weights
+        n = k = None
+
+        for p, y, masks, columns, placed, top in moves:
+            if y is None:
+                y = h
+                for u, b, _ in columns:
+                    if h - heights[u] - 1 - b < y:
+                        y = h - heights[u] - 1 - b
+                if y + top < 0:
+                    continue
+
+            lines = 0
+            for j, m in masks:
+                lines += rows[y + j] | m == full
+
+            if lines:
+                n = rows[:]
+                for j, m in masks:
+                    n[y + j] |= m
+                n = [0] * lines + [r for r in n if r != full]
+                hs, k = self.scan(n, w, h, table)
+                s, b = sum(hs), sum(abs(a - c) for a, c in zip(hs, hs[1:]))
+            else:
+                if not leaf:
+                    n, k = rows[:], key
+                    for j, m in masks:
+                        n[y + j] |= m
+                    for u, j in placed:
+                        k ^= table[y + j][u]
+
+                # only the columns of the figure and their neighbours change
+                hs, s, b = heights[:], total, bumpiness
+                for u, _, t in columns:
+                    if h - y - t > hs[u]:
+                        s += h - y - t - hs[u]
+                        hs[u] = h - y - t
+                for a in range(max(columns[0][0] - 1, 0), min(columns[-1][0] + 1, w - 1)):
+                    b += abs(hs[a] - hs[a + 1]) - abs(heights[a] - heights[a + 1])
+
+            c = cells + len(placed) - lines * w
+            r = reward + weights.lines * lines
+            self.evaluations += 1
+            # aggregate height, holes as the cells missing below the heights, and bumpiness
+            value = r + weights.height * s + weights.holes * (s - c) + weights.bumpiness * b
+            yield value if leaf else (value, r, n, hs, s, b, c, k, first or p)
+
+    @staticmethod
+    def scan(rows: list[int], width: int, height: int, table: list[list[int]]) -> tuple[list[int], int]:
+        # heights and hash from scratch, only needed after lines were cleared
+        heights, seen, key = [0] * width, 0, 0
+        for j, row in enumerate(rows):
+            new, keys = row & ~seen, table[j]
+            seen |= row
+            while new:
+                low = new & -new
+                heights[low.bit_length() - 1] = height - j
+                new ^= low
+            while row:
+                low = row & -row
+                key ^= keys[low.bit_length() - 1]
+                row ^= low
+
+        return heights, key
@@ -0,0 +1,139 @@
+from random import Random
+from typing import Iterable
+
+import numpy as np
+
+from consts import Action, State
+from figure import SHAPES
+
+# cell offsets per (kind, rotation, cell), rotations padded to four by cycling
+OFFSETS = np.array([[s.coords[r % s.rotations] for r in range(4)] for s in SHAPES], dtype=np.intp)
+ROTATIONS = np.array([s.rotations for s in SHAPES], dtype=np.intp)
+
+class BatchTetris:
+    def __init__(self, n: int, width: int, height: int, seeds: Iterable[int|None]|None = None):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.seeds = list(seeds) if seeds is not None else [None] * n
+        self.random = [Random(s) for s in self.seeds]
+
+        if len(self.seeds) != n:
+            raise ValueError(f"expected {n} seeds, got {len(self.seeds)}")
+
+        self.reset()
+
+    def reset(self):
+        n = self.n
+        self.board = np.zeros((n, self.height, self.width), dtype=np.uint8)
+        self.kind = np.zeros(n, dtype=np.intp)
+        self.nextkind = np.zeros(n, dtype=np.intp)
+        self.rotation = np.zeros(n, dtype=np.intp)
+        self.x = np.zeros(n, dtype=np.intp)
+        self.y = np.zeros(n, dtype=np.intp)
+        self.state = np.full(n, State.START, dtype=np.uint8)
+
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lines = np.zeros(n, dtype=np.int64)
+        self.pieces = np.zeros(n, dtype=np.int64)
+
+        for i, r in enumerate(self.random):
+            r.seed(self.seeds[i])
+            self.nextkind[i] = r.randint(0, len(SHAPES) - 1)
+
+        self._spawn(np.arange(n))
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.state == State.GAMEOVER
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray]:
+        actions = np.broadcast_to(np.asarray(actions), (self.n,))
+        live = self.state != State.GAMEOVER
+        score = self.score.copy()
+
+        tick = np.flatnonzero(live & (actions == Action.TICK))
+        self.state[tick[self.state[tick] == State.START]] = State.RUNNING
+        self._down(tick[self.state[tick] != State.PAUSE])
+
+        self._side(np.flatnonzero(live & (actions == Action.LEFT)), -1)
+        self._side(np.flatnonzero(live & (actions == Action.RIGHT)), 1)
+        self._rotate(np.flatnonzero(live & (actions == Action.ROTATE)))
+        self._down(np.flatnonzero(live & (actions == Action.DOWN)))
+        self._drop(np.flatnonzero(live & (actions == Action.DROP)))
+
+        pause = np.flatnonzero(live & (actions == Action.PAUSE))
+        self.state[pause] = np.where(self.state[pause] == State.RUNNING, State.PAUSE, State.RUNNING)
+
+        return self.score - score, self.done
+
+    def _cells(self, idx, dx=0, dy=0, rotation=None) -> tuple[np.ndarray, np.ndarray]:
+        offsets = OFFSETS[self.kind[idx], self.rotation[idx] if rotation is None else rotation]
+        return (self.x[idx, None] + dx + offsets[..., 0], self.y[idx, None] + dy + offsets[..., 1])
+
+    def _intersects(self, idx, dx=0, dy=0, rotation=None) -> np.ndarray:
+        u, v = self._cells(idx, dx, dy, rotation)
+        inside = (u >= 0) & (u < self.width) & (v >= 0) & (v < self.height)
+        hit = self.board[idx[:, None], np.clip(v, 0, self.height - 1), np.clip(u, 0, self.width - 1)] > 0
+        return (~inside | hit).any(axis=1)
+
+    def _spawn(self, idx):
+        self.kind[idx] = self.nextkind[idx]
+        self.rotation[idx] = 0
+        self.x[idx] = self.width // 2
+        self.y[idx] = 1
+
+        for i in idx:
+            self.nextkind[i] = self.random[i].randint(0, len(SHAPES) - 1)
+
+        self.state[idx[self._intersects(idx)]] = State.GAMEOVER
+
+    def _side(self, idx, dx):
+        self.x[idx[~self._intersects(idx, dx=dx)]] += dx
+
+    def _rotate(self, idx):
+        rotation = (self.rotation[idx] + 1) % ROTATIONS[self.kind[idx]]
+        ok = ~self._intersects(idx, rotation=rotation)
+        self.rotation[idx[ok]] = rotation[ok]
+
+    def _down(self, idx) -> np.ndarray:
+        blocked = self._intersects(idx, dy=1)
+        moved = idx[~blocked]
+        self.y[moved] += 1
+        self.score[moved] += 1
+
+        self._freeze(idx[blocked])
+        return moved
+
+    def _drop(self, idx):
+        while idx.size:
+            idx = self._down(idx)
+
+    def _freeze(self, idx):
+        if not idx.size:
+            return
+
+        u, v = self._cells(idx)
+        self.board[idx[:, None], v, u] = (self.kind[idx] + 1)[:, None]
+        self.pieces[idx] += 1
+
+        lines = self._break_lines(idx)
+        self.lines[idx] += lines
+        self.score[idx] += (lines ** 2) * 100
+
+        self._spawn(idx)
+
+    def _break_lines(self, idx) -> np.ndarray:
+        full = (self.board[idx] > 0).all(axis=2)
+        lines = full.sum(axis=1)
+
+        rows = np.flatnonzero(lines)
+        if rows.size:
+            boards, full = self.board[idx[rows]], full[rows]
+            boards[full] = 0
+
+            # stable sort puts the cleared rows on top, remaining rows keep their order
+            order = np.argsort(~full, axis=1, kind='stable')
+            self.board[idx[rows]] = np.take_along_axis(boards, order[:, :, None], axis=1)
+
+        return lines
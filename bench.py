@@ -0,0 +1,329 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse, fnmatch, json, platform, shutil, statistics, sys, tempfile, time
+from random import Random
+from typing import Callable
+
+import pygame as pg
+
+from component import BaseComponent
+from consts import Action, State
+from engine import Engine
+from figure import SHAPES
+from grid import BitGrid, Grid
+
+THEME = 'assets/default.theme'
+
+# benchmarks return a function to time and the number of operations it performs
+BENCHMARKS: dict[str, Callable[[], tuple[Callable[[], None], int]]] = {}
+
+def benchmark(name: str):
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+def board(cls: type[Grid] = Grid, seed: int = 0, rows: int = 8, full: int = 2) -> Grid:
+    # a stack of random rows with a gap each, plus a few full rows to break
+    random = Random(seed)
+    g = cls(10, 20)
+    for j in range(g.height - rows, g.height):
+        gap = random.randrange(g.width) if j >= g.height - rows + full else -1
+        for i in range(g.width):
+            if i != gap and (j > g.height - rows + 1 or random.random() < 0.7):
+                g.set(i, j, random.randint(1, 7))
+
+    return g
+
+def game(seed: int = 0) -> 'Tetris':
+    from tetris import Tetris
+
+    t = Tetris(10, 20, seed=seed)
+    t.set_theme(THEME)
+    t.reset()
+    return t
+
+def play(t: 'Tetris', random: Random, actions: list[Action], n: int):
+    for _ in range(n):
+        t.act(random.choice(actions))
+        if t.state == State.GAMEOVER:
+            t.reset()
+
+@benchmark('grid.intersects')
+def bench_intersects():
+    g, coords = board(), ((0, 0), (1, 0), (0, 1), (1, 1))
+    positions = [(x, y) for y in range(19) for x in range(-1, 10)]
+
+    def run():
+        for x, y in positions:
+            g.intersects(x, y, coords)
+    return run, len(positions)
+
+@benchmark('bitgrid.intersects')
+def bench_bit_intersects():
+    g, coords = board(BitGrid), ((0, 0), (1, 0), (0, 1), (1, 1))
+    positions = [(x, y) for y in range(19) for x in range(-1, 10)]
+
+    def run():
+        for x, y in positions:
+            g.intersects(x, y, coords)
+    return run, len(positions)
+
+@benchmark('grid.landing')
+def bench_landing():
+    # a tall board, walking down would take a row per step
+    g, coords = Grid(10, 200), SHAPES[1].coords[0]
+    for j in range(195, 200):
+        for i in range(j % 2, 10, 2):
+            g.set(i, j, 1)
+    positions = list(range(1, 9))
+
+    def run():
+        for x in positions:
+            g.landing(x, 1, coords)
+    return run, len(positions)
+
+@benchmark('grid.break_lines')
+def bench_break_lines():
+    # includes a copy, every call needs a board with full rows
+    g = board()
+
+    def run():
+        g.copy().break_lines()
+    return run, 1
+
+@benchmark('bitgrid.break_lines')
+def bench_bit_break_lines():
+    g = board(BitGrid)
+
+    def run():
+        g.copy().break_lines()
+    return run, 1
+
+@benchmark('grid.nonzero')
+def bench_nonzero():
+    g = board()
+
+    def run():
+        for _ in g.nonzero():
+            pass
+    return run, 1
+
+@benchmark('beam.best')
+def bench_beam():
+    from autoplay import BeamSearch
+    from figure import Figure
+
+    # evaluations per move vary, so this is the time per evaluation
+    g, search = board(BitGrid), BeamSearch(width=16, depth=3)
+    search.best(g, Figure(2, 0, 5, 1), 3)
+
+    def run():
+        search.best(g, Figure(2, 0, 5, 1), 3)
+    return run, search.evaluations
+
+@benchmark('tetris.drop')
+def bench_drop():
+    t, random = game(), Random(0)
+
+    def run():
+        play(t, random, [Action.DROP], 100)
+    return run, 100
+
+@benchmark('tetris.rotate')
+def bench_rotate():
+    t, random = game(), Random(0)
+
+    def run():
+        play(t, random, [Action.ROTATE], 100)
+    return run, 100
+
+@benchmark('engine.game')
+def bench_game():
+    random = Random(0)
+    actions = [Action.TICK, Action.LEFT, Action.RIGHT, Action.ROTATE, Action.DOWN, Action.DROP]
+
+    def run():
+        engine = Engine(10, 20, random.getrandbits(32))
+        while engine.state != State.GAMEOVER:
+            engine.step(random.choice(actions))
+    return run, 1
+
+@benchmark('tetris.draw')
+def bench_draw():
+    t = game()
+    play(t, Random(0), [Action.LEFT, Action.RIGHT, Action.DROP], 40)
+
+    def run():
+        t.renderer.invalidate()
+        t.draw()
+    return run, 1
+
+@benchmark('tetris.draw.incremental')
+def bench_draw_incremental():
+    t, random = game(), Random(0)
+    t.draw()
+
+    def run():
+        play(t, random, [Action.TICK, Action.LEFT, Action.RIGHT, Action.ROTATE, Action.DOWN], 1)
+        t.draw()
+    return run, 1
+
+@benchmark('menu.draw')
+def bench_menu_draw():
+    from menu import MenuStructure
+
+    m = MenuStructure(BaseComponent.screen)
+    m.set_theme(THEME)
+
+    def run():
+        m.draw()
+    return run, 1
+
+@benchmark('theme.load')
+def bench_theme():
+    from theme import Theme
+
+    def run():
+        Theme(THEME)
+    return run, 1
+
+@benchmark('theme.font')
+def bench_theme_font():
+    from theme import Theme, ThemeRegistry
+
+    # the first access of a font, which loads it from its file
+    theme = Theme(THEME)
+    defs = theme.data['fonts']['defs']
+
+    def run():
+        ThemeRegistry._fonts.clear()
+        defs['normal'].pop('_font', None)
+        theme.get_font('normal')
+    return run, 1
+
+# temporary high score stores, removed after the run
+_stores: list[str] = []
+
+def highscores_store() -> type['HighScores']:
+    from highscores import HighScores
+
+    # every benchmark gets its own store with 10k entries, the user's scores are never opened
+    HighScores.close()
+    tmp = tempfile.mkdtemp()
+    _stores.append(tmp)
+    HighScores._filename = os.path.join(tmp, 'scores.db')
+    HighScores._legacy = os.path.join(tmp, 'scores.dat')
+    HighScores.add_items([{"name": f"p{i}", "score": i * 10, "date": "2024-01-01T00:00:00"} for i in range(10000)])
+    return HighScores
+
+def remove_stores():
+    if _stores:
+        from highscores import HighScores
+        HighScores.close()
+    while _stores:
+        shutil.rmtree(_stores.pop(), ignore_errors=True)
+
+@benchmark('highscores.add_item')
+def bench_highscores():
+    HighScores = highscores_store()
+
+    def run():
+        HighScores.add_item(name="bench", score=100)
+    return run, 1
+
+@benchmark('highscores.top')
+def bench_highscores_top():
+    HighScores = highscores_store()
+
+    def run():
+        HighScores.top(10)
+        HighScores.rank(50000)
+        HighScores.best("p100")
+    return run, 1
+
+@benchmark('highscores.rank')
+def bench_highscores_rank():
+    HighScores = highscores_store()
+
+    # a low score is ranked below nearly every entry
+    def run():
+        HighScores.rank(1505)
+    return run, 1
+
+def measure(fn: Callable[[], None], ops: int, repeat: int, duration: float) -> dict:
+    # calibrate the number of calls per sample to the target duration
+    start = time.perf_counter()
+    fn()
+    number = max(1, int(duration / repeat / max(time.perf_counter() - start, 1e-9)))
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number / ops * 1e6)
+
+    return {"median_us": statistics.median(samples), "min_us": min(samples), "ops": ops * number * repeat}
+
+def run(names: list[str], repeat: int = 5, duration: float = 1.) -> dict:
+    results = {}
+    for name in names:
+        try:
+            results[name] = measure(*BENCHMARKS[name](), repeat, duration)
+        except Exception as e:
+            print(f"error: {name}: {e}", file=sys.stderr)
+            results[name] = {"error": str(e)}
+        else:
+            print(f"{name:28} {results[name]['median_us']:12.2f} us", file=sys.stderr)
+
+    return {"python": platform.python_version(), "pygame": pg.version.ver, "results": results}
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, r in current['results'].items():
+        b = baseline['results'].get(name)
+        if b is None or 'median_us' not in b or 'median_us' not in r:
+            continue
+
+        change = r['median_us'] / b['median_us'] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{name:28} {b['median_us']:12.2f} {r['median_us']:12.2f} us {change:+8.1%} {flag}")
+        if flag:
+            regressions.append(name)
+
+    return regressions
+
+def main(args):
+    parser = argparse.ArgumentParser(description="time the engine, rendering and persistence hot paths")
+    parser.add_argument('-k', '--filter', default='*', help="only run benchmarks matching the pattern")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="samples per benchmark")
+    parser.add_argument('-t', '--time', type=float, default=1., help="seconds per benchmark")
+    parser.add_argument('-o', '--output', help="write the results as json")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare against stored results, exits with 1 on a regression")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown flagged as a regression")
+    opts = parser.parse_args(args)
+
+    pg.init()
+    BaseComponent.screen = pg.Surface((400, 600))
+
+    names = [n for n in BENCHMARKS if fnmatch.fnmatch(n, opts.filter)]
+    try:
+        results = run(names, opts.repeat, opts.time)
+    finally:
+        remove_stores()
+
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    elif not opts.compare:
+        print(json.dumps(results, indent=2))
+
+    if opts.compare:
+        with open(opts.compare) as f:
+            regressions = compare(results, json.load(f), opts.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,16 +1,20 @@
+from cache import LRUCache
 from consts import DrawCode
-from theme import Color, Theme
+from theme import Color, Theme, ThemeRegistry
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import cast
+from dataclasses import dataclass, field
+from typing import cast, ClassVar
 
 import pygame as pg
 
 @dataclass
 class BaseComponent(ABC):
     screen: pg.surface.Surface
-    theme: Theme = Theme()
+    theme: Theme = field(default_factory=Theme)
+    text_cache: ClassVar[LRUCache[tuple, pg.surface.Surface]] = LRUCache(256)
+    elapsed: float = 0.
+    theme_version: int = -1
 
     @abstractmethod
     def draw(self) -> bool: ...
@@ -18,7 +22,7 @@ class BaseComponent(ABC):
     def draw_text(self, text: str|pg.surface.Surface,
                   x: int|DrawCode = DrawCode.CENTER, y: int|DrawCode = DrawCode.CENTER, color: Color = Color([0,0,0]),
                   font: str = "normal", antialias: bool = True) -> bool:
-        r = self.theme.get_font(font).render(text, antialias, color) if isinstance(text, str) else text
+        r = self.render_text(text, color, font, antialias) if isinstance(text, str) else text
 
         x = x if x != DrawCode.CENTER else (BaseComponent.screen.get_width() - r.get_width()) // 2
         y = y if y != DrawCode.CENTER else (BaseComponent.screen.get_height() - r.get_height()) // 2
@@ -27,18 +31,39 @@ class BaseComponent(ABC):
 
         return True
 
+    def render_text(self, text: str, color: Color = Color([0,0,0]), font: str = "normal", antialias: bool = True) -> pg.surface.Surface:
+        key = (self.theme.source, self.theme.version, font, text, color, antialias)
+        return BaseComponent.text_cache.get_or_create(key, lambda: self.theme.get_font(font).render(text, antialias, color))
+
     @abstractmethod
     def handle_key(self, key: int) -> int: ...
 
     def reset(self):
+        self.elapsed = 0.
         self.update()
 
     def update(self):
         pass
 
-    def get_time_scaling(self):
-        return 1
+    def get_dirty_rects(self) -> list[pg.Rect]|None:
+        return None
+
+    def tick(self, ms: float):
+        self.elapsed += ms
+        gravity = self.get_gravity()
+
+        while self.elapsed >= gravity:
+            self.elapsed -= gravity
+            self.update()
+
+    def get_gravity(self) -> float:
+        return 1000.
 
     def set_theme(self, source: str) -> bool:
-        self.theme = Theme(source)
+        # returns whether anything changed, switching back to a loaded theme is free
+        theme = ThemeRegistry.get(source)
+        if theme is self.theme and theme.version == self.theme_version:
+            return False
+
+        self.theme, self.theme_version = theme, theme.version
         return True
@@ -16,3 +16,22 @@ class State(IntEnum):
 class DrawCode(Enum):
     NORMAL = "exact"
     CENTER = "center"
+
+class Action(IntEnum):
+    TICK = 0
+    LEFT = 1
+    RIGHT = 2
+    ROTATE = 3
+    DOWN = 4
+    DROP = 5
+    PAUSE = 6
+
+class Event(IntEnum):
+    MOVE = 0
+    ROTATE = 1
+    LOCK = 2
+    CLEAR = 3
+    SPAWN = 4
+    PAUSE = 5
+    RESUME = 6
+    GAMEOVER = 7
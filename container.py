@@ -1,13 +1,70 @@
 from abc import ABC, abstractmethod
-import copy, json
+import atexit, copy, json, os, threading
 from typing import cast, Generic, Iterator, TypeVar
 
 T = TypeVar('T')
 
+class FileWriter:
+    def __init__(self):
+        self.pending: dict[str, str] = {}
+        self.busy = False
+        self.cond = threading.Condition()
+        self.thread: threading.Thread|None = None
+
+    def write(self, filename: str, data: str):
+        # only the latest data per file is kept, bursts of writes end up as one
+        with self.cond:
+            self.pending[filename] = data
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='writer', daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def flush(self, timeout: float|None = None) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending)
+                pending, self.pending, self.busy = self.pending, {}, True
+
+            try:
+                for filename, data in pending.items():
+                    try:
+                        self.write_atomic(filename, data)
+                    except Exception as e:
+                        # one bad file does not stop the others or the thread
+                        print(f"error: {filename}: {e}")
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    @staticmethod
+    def write_atomic(filename: str, data: str):
+        # readers see either the old or the new file, never a partial one
+        tmp = filename + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+
+        # the rename itself is only durable once the directory is synced
+        fd = os.open(os.path.dirname(os.path.abspath(filename)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
 class AutoContainer(ABC, Generic[T]):
     _filename: str
     _data: list[T] = []
     _defaults: list[T] = []
+    _writer: FileWriter = FileWriter()
+    _version: int = 0
 
     @classmethod
     def __len__(cls) -> int:
@@ -18,6 +75,11 @@ class AutoContainer(ABC, Generic[T]):
         for i in cls._get_data():
             yield cls._parse_item(i)
 
+    @classmethod
+    def version(cls) -> int:
+        # changes whenever the data does, views built from it can be cached until then
+        return cls._version
+
     @classmethod
     def _get_data(cls) -> list[T]:
         if not len(cls._data):
@@ -33,30 +95,49 @@ class AutoContainer(ABC, Generic[T]):
 
     @classmethod
     def _load_data(cls) -> bool:
+        cls._version += 1
         try:
             with open(cls._filename, 'r') as f:
                 cls._data = cls._parse_data(f.read())
+        except FileNotFoundError:
+            cls._data = cls._create_defaults()
+            return cls._store_data()
         except (IOError, json.JSONDecodeError, Exception) as e:
             print(f"error: {e}")
-            cls._data = copy.copy(cls._defaults)
+
+            # keep an unreadable file for inspection instead of overwriting it with defaults
+            try:
+                os.replace(cls._filename, cls._filename + '.corrupt')
+            except OSError as e:
+                print(f"error: {e}")
+            cls._data = cls._create_defaults()
             return cls._store_data()
 
         return True
 
+    @classmethod
+    def _create_defaults(cls) -> list[T]:
+        return copy.copy(cls._defaults)
+
     @classmethod
     def _store_data(cls) -> bool:
+        # serialized here, written to disk by the background writer
         try:
-            with open(cls._filename, 'w') as f:
-                f.write(cls._serialize_data())
-        except (IOError, Exception) as e:
+            cls._writer.write(cls._filename, cls._serialize_data())
+        except Exception as e:
             print(f"error: {e}")
             return False
 
         return True
 
+    @classmethod
+    def flush(cls, timeout: float|None = None) -> bool:
+        return cls._writer.flush(timeout)
+
     @classmethod
     def add_item(cls, **kwargs) -> bool:
         cls._data += [cls._create_item(**kwargs)]
+        cls._version += 1
         return cls._store_data()
 
     @staticmethod
@@ -70,3 +151,6 @@ class AutoContainer(ABC, Generic[T]):
     @staticmethod
     @abstractmethod
     def _serialize_data() -> str: ...
+
+# pending writes still reach the disk when the app exits without App.quit
+atexit.register(AutoContainer.flush, 5)
@@ -0,0 +1,194 @@
+from consts import Action, Event, State
+from engine import Engine
+
+import argparse, glob, itertools, json, os, struct, sys, time
+from bisect import bisect_right
+from typing import Iterator
+
+import numpy as np
+
+VERSION = 1
+CAPACITY = 1 << 16
+
+# the fields after the board, packed like the numpy dtype so records are written as plain bytes
+RECORD = struct.Struct('<BBhhBBi?QI')
+
+_parts = itertools.count()
+
+def part_name() -> str:
+    # unique across the processes and writers recording into one directory
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_parts)}"
+
+def transition_dtype(width: int, height: int) -> np.dtype:
+    return np.dtype([('board', np.uint8, (height, width)), ('kind', np.uint8), ('rotation', np.uint8),
+                     ('x', np.int16), ('y', np.int16), ('next', np.uint8), ('action', np.uint8), ('reward', np.int32),
+                     ('done', np.bool_), ('seed', np.uint64), ('step', np.uint32)])
+
+class TransitionWriter:
+    # one writer per process, each writes its own part of the dataset directory
+    def __init__(self, path: str, width: int, height: int, part: str|None = None, capacity: int = CAPACITY):
+        self.path = path
+        self.part = part if part is not None else part_name()
+        self.width = width
+        self.height = height
+        self.capacity = capacity
+        self.dtype = transition_dtype(width, height)
+        self.count = 0
+        self.shards: list[str] = []
+        self.games: list[list[int]] = []
+        self.game: list[int]|None = None
+        self.board = b''
+        self.pieces = -1
+        self.shard: np.memmap|None = None
+        self.raw: memoryview|None = None
+        os.makedirs(path, exist_ok=True)
+
+    def _roll(self):
+        # shards are preallocated at full size, the index holds the number of records in use
+        if self.shard is not None:
+            self.shard.flush()
+            self._write_index()
+
+        name = f"{self.part}-{len(self.shards):05}.npy"
+        self.shard = np.lib.format.open_memmap(os.path.join(self.path, name), mode='w+', dtype=self.dtype,
+                                               shape=(self.capacity,))
+        self.raw = memoryview(self.shard.view(np.uint8))
+        self.shards.append(name)
+
+    def begin(self, seed: int):
+        self.end()
+        self.game = [seed, self.count, 0]
+        self.pieces = -1
+
+    def end(self):
+        if self.game is not None:
+            self.games.append(self.game)
+            self.game = None
+
+    def write(self, board: bytes, kind: int, rotation: int, x: int, y: int, nextkind: int, action: Action,
+              reward: int, done: bool):
+        i = self.count % self.capacity
+        if i == 0:
+            self._roll()
+
+        seed, _, step = self.game
+        size = self.dtype.itemsize
+        self.raw[i * size:(i + 1) * size] = board + RECORD.pack(kind, rotation, x, y, nextkind, action, reward, done,
+                                                                seed, step)
+        self.count += 1
+        self.game[2] += 1
+        if done:
+            self.end()
+
+    def step(self, engine: Engine, action: Action) -> list[Event]:
+        # steps the engine and records the state it acted on with the outcome
+        if engine.state == State.GAMEOVER:
+            return engine.step(action)
+
+        if self.game is None:
+            self.begin(engine.seed)
+
+        # within a game the board only changes when a piece locks
+        if engine.pieces != self.pieces:
+            self.board, self.pieces = engine.grid.tobytes(), engine.pieces
+
+        f, nextkind = engine.figure, engine.nextfigure.kind
+        kind, rotation, x, y = f.kind, f.rotation, f.x, f.y
+        events = engine.step(action)
+        self.write(self.board, kind, rotation, x, y, nextkind, action, engine.reward, Event.GAMEOVER in events)
+        return events
+
+    def _write_index(self):
+        index = {"version": VERSION, "width": self.width, "height": self.height, "capacity": self.capacity,
+                 "count": self.count, "shards": self.shards, "games": self.games}
+        tmp = os.path.join(self.path, f".{self.part}.json.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp, os.path.join(self.path, f"{self.part}.json"))
+
+    def close(self):
+        self.end()
+        if self.shard is not None:
+            self.shard.flush()
+            self.raw.release()
+            self.shard = self.raw = None
+        if self.count:
+            self._write_index()
+
+class TransitionReader:
+    def __init__(self, path: str):
+        self.path = path
+        self.parts: list[dict] = []
+        for name in sorted(glob.glob(os.path.join(path, '*.json'))):
+            with open(name) as f:
+                index = json.load(f)
+            if index.get('version') != VERSION:
+                raise ValueError(f"{name}: unsupported version {index.get('version')}")
+            self.parts.append(index)
+
+        if len({(p['width'], p['height']) for p in self.parts}) > 1:
+            raise ValueError(f"{path}: parts with different board sizes")
+
+        self.offsets = [0]
+        for p in self.parts:
+            self.offsets.append(self.offsets[-1] + p['count'])
+        self._shards: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def _locate(self, i: int) -> tuple[np.ndarray, int]:
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+
+        n = bisect_right(self.offsets, i) - 1
+        part, i = self.parts[n], i - self.offsets[n]
+        name = part['shards'][i // part['capacity']]
+
+        # opened on first use, pages are only read when records are accessed
+        shard = self._shards.get(name)
+        if shard is None:
+            shard = self._shards[name] = np.load(os.path.join(self.path, name), mmap_mode='r')
+        return shard, i % part['capacity']
+
+    def __getitem__(self, i: int) -> np.void:
+        shard, j = self._locate(i)
+        return shard[j]
+
+    def batch(self, indices) -> np.ndarray:
+        indices = np.asarray(indices)
+        if not len(self.parts):
+            raise IndexError("empty dataset")
+
+        out = np.empty(len(indices), dtype=transition_dtype(self.parts[0]['width'], self.parts[0]['height']))
+        for k, i in enumerate(indices):
+            shard, j = self._locate(int(i))
+            out[k] = shard[j]
+        return out
+
+    def games(self) -> Iterator[tuple[int, int, int]]:
+        # (seed, first record, number of records)
+        for offset, p in zip(self.offsets, self.parts):
+            for seed, start, length in p['games']:
+                yield seed, offset + start, length
+
+    def game(self, start: int, length: int) -> np.ndarray:
+        return self.batch(range(start, start + length))
+
+def main(args):
+    parser = argparse.ArgumentParser(description="inspect transitions recorded with sim.py --record")
+    parser.add_argument('path')
+    parser.add_argument('-n', type=int, default=0, help="print the first n records")
+    opts = parser.parse_args(args)
+
+    reader = TransitionReader(opts.path)
+    games = list(reader.games())
+    print(f"parts: {len(reader.parts)}  records: {len(reader)}  games: {len(games)}  "
+          f"done: {sum(int(reader[s + n - 1]['done']) for _, s, n in games if n)}")
+    for i in range(min(opts.n, len(reader))):
+        r = reader[i]
+        print(f"{i:8}  seed {r['seed']:10}  step {r['step']:5}  kind {r['kind']} rot {r['rotation']} "
+              f"x {r['x']:3} y {r['y']:3}  {Action(r['action']).name:6}  reward {r['reward']:4}  done {r['done']}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,182 @@
+from random import Random
+
+from consts import Action, Event, State
+from figure import Figure, SHAPES
+from grid import Grid
+from snapshot import Snapshot, keep_state
+
+def gravity(level: int) -> float:
+    # milliseconds per row, one row per second at level 1
+    return max(1000 * max(0.8 - (level - 1) * 0.007, 0.) ** (level - 1), 1.)
+
+class Engine:
+    figure: Figure
+    nextfigure: Figure
+
+    def __init__(self, width: int, height: int, seed: int|None = None, grid: type[Grid] = Grid):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.grid_type = grid
+        self.random = Random(seed)
+        self.events: list[Event] = []
+        self.figure = Figure()
+        self.nextfigure = Figure()
+        self.reset()
+
+    def reset(self):
+        self.state = State.START
+        self.grid = self.grid_type(self.width, self.height)
+        self.random.seed(self.seed)
+
+        self.score = 0
+        self.level = 1
+        self.lines = 0
+        self.pieces = 0
+        self.draws = 0
+        self.reward = 0
+        self.resting: tuple[int, int] = (-1, 0)
+
+        self.nextfigure.kind = self.create_figure()
+        self.next_figure()
+
+    def snapshot(self) -> Snapshot:
+        f = self.figure
+        # seeded games find their random state again from the number of draws
+        rng = self.random.getstate() if self.seed is None else None
+        if self.seed is not None:
+            keep_state(self.seed, self.draws, self.random)
+
+        return Snapshot(self.width, self.height, self.grid.tobytes(), self.state, self.score, self.level, self.lines,
+                        self.pieces, self.draws, (f.kind, f.rotation, f.x, f.y), self.nextfigure.kind, self.seed, rng)
+
+    def restore(self, s: Snapshot):
+        # in place, the grid and figure objects are kept
+        self.grid.frombytes(s.board)
+        self.state = State(s.state)
+        self.score, self.level, self.lines, self.pieces, self.draws = s.score, s.level, s.lines, s.pieces, s.draws
+        self.seed = s.seed
+        self.random.setstate(s.random_state())
+
+        f, n = self.figure, self.nextfigure
+        f.kind, f.rotation, f.x, f.y = s.figure
+        n.kind, n.rotation, n.x, n.y = s.nextkind, 0, 0, 0
+
+    def step(self, action: Action) -> list[Event]:
+        self.events = []
+        self.reward = 0
+
+        if self.state == State.GAMEOVER:
+            return self.events
+
+        match action:
+            case Action.TICK:
+                self.update()
+            case Action.LEFT:
+                self.side(-1)
+            case Action.RIGHT:
+                self.side(1)
+            case Action.ROTATE:
+                self.rotate()
+            case Action.DOWN:
+                self.down()
+            case Action.DROP:
+                self.drop()
+            case Action.PAUSE:
+                self.pause()
+
+        return self.events
+
+    def create_figure(self) -> int:
+        self.draws += 1
+        return self.random.randint(0, len(SHAPES) - 1)
+
+    def next_figure(self):
+        if self.state == State.GAMEOVER:
+            return
+
+        # swap the two figure slots instead of allocating new figures
+        f, self.nextfigure = self.nextfigure, self.figure
+        self.figure = f
+        f.x = self.grid.width // 2
+        f.y = 1
+
+        n = self.nextfigure
+        n.kind = self.create_figure()
+        n.rotation = n.x = n.y = 0
+        self.events.append(Event.SPAWN)
+
+        if self.grid.intersects(f.x, f.y, SHAPES[f.kind].coords[f.rotation]):
+            self.state = State.GAMEOVER
+            self.events.append(Event.GAMEOVER)
+
+    def update(self):
+        match self.state:
+            case State.START:
+                self.state = State.RUNNING
+            case State.PAUSE:
+                return
+
+        self.down()
+
+    def pause(self):
+        self.state = State.PAUSE if self.state == State.RUNNING else State.RUNNING
+        self.events.append(Event.PAUSE if self.state == State.PAUSE else Event.RESUME)
+
+    def landing(self) -> int:
+        # kept until the figure moves or the board changes
+        f = self.figure
+        key = self.grid.position_key(f.kind, f.rotation, f.x, f.y)
+        if self.resting[0] != key:
+            self.resting = (key, self.grid.landing(f.x, f.y, SHAPES[f.kind].coords[f.rotation]))
+
+        return self.resting[1]
+
+    def drop(self):
+        f, y = self.figure, self.landing()
+        if y > f.y:
+            self.score += y - f.y
+            f.y = y
+            self.events.append(Event.MOVE)
+
+        self.freeze()
+
+    def down(self):
+        f = self.figure
+        if self.grid.intersects(f.x, f.y + 1, SHAPES[f.kind].coords[f.rotation]):
+            return self.freeze() and False
+        else:
+            self.score += 1
+            f.y += 1
+            self.events.append(Event.MOVE)
+            return True
+
+    def freeze(self):
+        f = self.figure
+        self.grid.burn(f.x, f.y, SHAPES[f.kind].coords[f.rotation], f.kind + 1)
+        self.pieces += 1
+        self.events.append(Event.LOCK)
+
+        lines = self.grid.break_lines()
+        if lines:
+            self.reward = (lines ** 2) * 100
+            self.lines += lines
+            self.score += self.reward
+            self.events.append(Event.CLEAR)
+
+        self.next_figure()
+
+    def side(self, dx):
+        f = self.figure
+        if not self.grid.intersects(f.x + dx, f.y, SHAPES[f.kind].coords[f.rotation]):
+            f.x += dx
+            self.events.append(Event.MOVE)
+
+    def rotate(self):
+        f = self.figure
+        shape = SHAPES[f.kind]
+        rotation = (f.rotation + 1) % shape.rotations
+
+        if not self.grid.intersects(f.x, f.y, shape.coords[rotation]):
+            f.rotation = rotation
+            self.events.append(Event.ROTATE)
@@ -9,6 +9,10 @@ class BaseFactory(Generic[T]):
     _mapping: dict = {}
     _module: str|list[str] = ''
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._items = {}
+
     @classmethod
     def create(cls, name: str, kwords: dict = {}) -> T:
         if not name in cls._mapping:
@@ -17,11 +21,16 @@ class BaseFactory(Generic[T]):
         if not name in cls._items:
             modules = [cls._module] if not isinstance(cls._module, list) else cls._module
 
+            # modules are only imported when one of their classes is first needed
             for m in modules:
                 try:
-                    cls._items[name] = getattr(importlib.import_module(m), cls._mapping[name])(**kwords)
-                    break
-                except:
+                    c = getattr(importlib.import_module(m), cls._mapping[name])
+                except (ImportError, AttributeError):
                     continue
 
+                cls._items[name] = c(**kwords)
+                break
+            else:
+                raise Exception(f"no module in {modules} provides {cls._mapping[name]}")
+
         return cls._items[name]
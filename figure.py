@@ -0,0 +1,57 @@
+FIGURES = [
+    (2, [(0, 0), (0, -1), (0, 1), (0, 2)]),
+    (4, [(0, 0), (0, -1), (0, 1), (1, 1)]),
+    (4, [(0, 0), (0, -1), (0, 1), (-1, 1)]),
+    (4, [(0, 0), (0, -1), (-1, 0), (1, 0)]),
+    (2, [(0, 0), (0, -1), (1, 0), (1, 1)]),
+    (2, [(0, 0), (0, -1), (-1, 0), (-1, 1)]),
+    (1, [(0, 0), (1,  0), (1, 1), (0, 1)])
+]
+
+def rotate(icoords: list[tuple], rotation: int) -> tuple[tuple[int, int], ...]:
+    coords = list(icoords)
+
+    for r in range(rotation):
+        for i in range(1, len(coords)):
+            x = coords[i][1]
+            y = coords[i][0]
+            coords[i] = (-x, y)
+
+    return tuple(coords)
+
+class Shape:
+    __slots__ = ('kind', 'rotations', 'coords', 'bounds')
+
+    def __init__(self, kind: int, rotations: int, icoords: list[tuple]):
+        self.kind = kind
+        self.rotations = rotations
+        self.coords = tuple(rotate(icoords, r) for r in range(rotations))
+        self.bounds = tuple((min(i for i, _ in c), min(j for _, j in c), max(i for i, _ in c), max(j for _, j in c))
+                            for c in self.coords)
+
+SHAPES = tuple(Shape(k, r, c) for k, (r, c) in enumerate(FIGURES))
+
+class Figure:
+    __slots__ = ('kind', 'rotation', 'x', 'y')
+
+    def __init__(self, kind: int = 0, rotation: int = 0, x: int = 0, y: int = 0):
+        self.kind = kind
+        self.rotation = rotation
+        self.x = x
+        self.y = y
+
+    @property
+    def shape(self) -> Shape:
+        return SHAPES[self.kind]
+
+    @property
+    def coords(self) -> tuple[tuple[int, int], ...]:
+        return SHAPES[self.kind].coords[self.rotation]
+
+    @property
+    def color(self) -> int:
+        return self.kind
+
+    @property
+    def rotations(self) -> int:
+        return SHAPES[self.kind].rotations
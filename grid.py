@@ -1,18 +1,193 @@
+import copy
 from dataclasses import dataclass
+from random import Random
+
+MASK = (1 << 64) - 1
+
+def mix(v: int) -> int:
+    # splitmix64 finalizer
+    v = (v + 0x9E3779B97F4A7C15) & MASK
+    v = ((v ^ (v >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    v = ((v ^ (v >> 27)) * 0x94D049BB133111EB) & MASK
+    return v ^ (v >> 31)
+
+_zobrist: dict[tuple[int, int], tuple[list[list[int]], int]] = {}
+
+def zobrist_keys(width: int, height: int) -> tuple[list[list[int]], int]:
+    # a random key per cell and one for the board size. Keys come from a fixed seed,
+    # so hashes can be compared between processes.
+    keys = _zobrist.get((width, height))
+    if keys is None:
+        random = Random(f"zobrist {width}x{height}")
+        table = [[random.getrandbits(64) for _ in range(width)] for _ in range(height)]
+        keys = _zobrist[(width, height)] = (table, random.getrandbits(64))
+
+    return keys
 
 @dataclass
 class Grid:
     width: int
     height: int
 
+    _bottoms = {}
+
     def __post_init__(self):
         self._data = [0] * self.width * self.height
+        self.dirty: set[int] = set()
+        self._init_stats()
+
+    def _init_stats(self):
+        # board statistics, kept up to date as cells change
+        self._heights = [0] * self.width
+        self._counts = [0] * self.height
+        self._cells = 0
+        self._total = 0
+        # the highest row with a cell in it, height when the board is empty
+        self._top = self.height
+
+        # occupancy hash, the colors of the cells do not count
+        self._table, self._size = zobrist_keys(self.width, self.height)
+        self._occupied = [0] * self.height
+        self._hash = 0
+
+    @property
+    def heights(self) -> list[int]:
+        return self._heights
+
+    @property
+    def counts(self) -> list[int]:
+        return self._counts
+
+    @property
+    def holes(self) -> int:
+        return self._total - self._cells
+
+    @property
+    def max_height(self) -> int:
+        return self.height - self._top
+
+    @property
+    def occupied(self) -> list[int]:
+        # a bitmask of the filled columns per row
+        return self._occupied
+
+    @property
+    def zobrist(self) -> int:
+        return self._hash
+
+    @property
+    def zobrist_table(self) -> list[list[int]]:
+        return self._table
+
+    def position_key(self, kind: int, rotation: int, x: int, y: int) -> int:
+        # the board hash combined with the active figure and the board size
+        return self._hash ^ mix(self._size ^ (kind | rotation << 4 | (x & 0xffff) << 8 | (y & 0xffff) << 24))
 
     def get(self, x, y):
         return self._data[y * self.width + x]
 
     def set(self, x, y, c):
+        old = self._data[y * self.width + x]
         self._data[y * self.width + x] = c
+        self.dirty.add(y)
+        self._update(x, y, old > 0, c > 0)
+
+    def _update(self, x, y, old, new):
+        if old == new:
+            return
+
+        d = 1 if new else -1
+        self._counts[y] += d
+        self._cells += d
+        self._occupied[y] ^= 1 << x
+        self._hash ^= self._table[y][x]
+
+        if new and y < self._top:
+            self._top = y
+        elif not new and y == self._top:
+            self._lower()
+
+        h = self.height - y
+        if new and h > self._heights[x]:
+            self._total += h - self._heights[x]
+            self._heights[x] = h
+        elif not new and h == self._heights[x]:
+            self._rescan(x)
+
+    def _lower(self):
+        # the rows above the top one are empty, so the scan only moves down
+        while self._top < self.height and not self._counts[self._top]:
+            self._top += 1
+
+    def _rescan(self, x):
+        h = 0
+        for j in range(self.height - self._heights[x], self.height):
+            if self.get(x, j) > 0:
+                h = self.height - j
+                break
+
+        self._total += h - self._heights[x]
+        self._heights[x] = h
+
+    def _cleared(self, rows):
+        # rows are the full rows before they were removed, every column reaches the top one
+        lines, removed = len(rows), set(rows)
+        self._counts = [0] * lines + [n for j, n in enumerate(self._counts) if j not in removed]
+        self._cells -= lines * self.width
+        self._total -= lines * self.width
+        self._lower()
+
+        # the rows above the lowest cleared one move, their cells are rehashed at the new place
+        bottom = max(rows)
+        self._rehash(bottom)
+        self._occupied = [0] * lines + [k for j, k in enumerate(self._occupied) if j not in removed]
+        self._rehash(bottom)
+
+        for x, h in enumerate(self._heights):
+            self._heights[x] = h - lines
+            if self.height - h in removed:
+                self._rescan(x)
+
+    def _rehash(self, bottom):
+        # toggles the cells of rows 0 to bottom in and out of the hash
+        for j in range(bottom + 1):
+            bits, keys = self._occupied[j], self._table[j]
+            while bits:
+                low = bits & -bits
+                self._hash ^= keys[low.bit_length() - 1]
+                bits ^= low
+
+    def _rebuild(self):
+        self._init_stats()
+        for j in range(self.height):
+            for i in range(self.width):
+                if self.get(i, j) > 0:
+                    self._counts[j] += 1
+                    self._heights[i] = self._heights[i] or self.height - j
+                    self._occupied[j] |= 1 << i
+                    self._hash ^= self._table[j][i]
+
+        self._cells = sum(self._counts)
+        self._total = sum(self._heights)
+        self._top = self.height - max(self._heights)
+        self.dirty.update(range(self.height))
+
+    def tobytes(self) -> bytes:
+        return bytes(self._data)
+
+    def frombytes(self, data: bytes):
+        # one byte per cell, row by row, restored in place
+        self._data = list(data)
+        self._rebuild()
+
+    def copy(self) -> 'Grid':
+        g = copy.copy(self)
+        g._data = self._data[:]
+        g._heights = self._heights[:]
+        g._counts = self._counts[:]
+        g._occupied = self._occupied[:]
+        g.dirty = set()
+        return g
 
     def nonzero(self):
         for i, c in enumerate(self._data):
@@ -20,7 +195,7 @@ class Grid:
                 yield (i % self.width, i // self.width, c)
 
     def full(self, i):
-        return 0 not in self._data[i * self.width:(i + 1) * self.width]
+        return self._counts[i] == self.width
 
     def intersects(self, x, y, coords):
         for i, j in coords:
@@ -34,13 +209,39 @@ class Grid:
         for i, j in coords:
             self.set(x + i, y + j, c)
 
+    def landing(self, x, y, coords):
+        # the row the figure comes to rest on, straight from the column heights
+        bottoms = Grid._bottoms.get(coords)
+        if bottoms is None:
+            lowest = {}
+            for i, j in coords:
+                lowest[i] = max(lowest.get(i, j), j)
+            bottoms = Grid._bottoms[coords] = tuple(lowest.items())
+
+        rest = self.height
+        for i, j in bottoms:
+            r = self.height - self._heights[x + i] - 1 - j
+            if r < y:
+                # under an overhang the surface says nothing, walk down instead
+                while not self.intersects(x, y + 1, coords):
+                    y += 1
+                return y
+            rest = min(rest, r)
+
+        return rest
+
     def _move_lines(self, s, i):
         dy = (i - s)
         self._data[dy * self.width:i * self.width] = self._data[0:s * self.width]
         self._data[0:dy * self.width] = [0] * dy * self.width
+        self.dirty.update(range(i))
         return dy
 
     def break_lines(self):
+        rows = [i for i in range(self.height) if self.full(i)]
+        if not rows:
+            return 0
+
         s, lines = -1, 0
         for i in range(self.height):
             if self.full(i):
@@ -50,6 +251,109 @@ class Grid:
                 s = -1
 
         if s >= 0:
-            self._move_lines(s, 20)
+            lines += self._move_lines(s, self.height)
+
+        self._cleared(rows)
+        return lines
+
+@dataclass
+class BitGrid(Grid):
+    _shapes = {}
+
+    def __post_init__(self):
+        self._full = (1 << self.width) - 1
+        self._rows = [0] * self.height
+        self._colors = [[0] * self.width for _ in range(self.height)]
+        self._masks = BitGrid._shapes.setdefault(self.width, {})
+        self.dirty: set[int] = set()
+        self._init_stats()
+
+    def get(self, x, y):
+        return self._colors[y][x]
+
+    def set(self, x, y, c):
+        old = self._colors[y][x]
+        self._colors[y][x] = c
+        self.dirty.add(y)
+        self._update(x, y, old > 0, c > 0)
+        if c > 0:
+            self._rows[y] |= 1 << x
+        else:
+            self._rows[y] &= ~(1 << x)
+
+    def tobytes(self) -> bytes:
+        return b''.join(map(bytes, self._colors))
+
+    def frombytes(self, data: bytes):
+        w = self.width
+        self._colors = [list(data[j * w:(j + 1) * w]) for j in range(self.height)]
+        self._rows = [sum(1 << i for i, c in enumerate(row) if c > 0) for row in self._colors]
+        self._rebuild()
+
+    def copy(self) -> 'BitGrid':
+        g = copy.copy(self)
+        g._rows = self._rows[:]
+        g._colors = [row[:] for row in self._colors]
+        g._heights = self._heights[:]
+        g._counts = self._counts[:]
+        g._occupied = self._occupied[:]
+        g.dirty = set()
+        return g
+
+    def nonzero(self):
+        for j, row in enumerate(self._rows):
+            if row:
+                for i, c in enumerate(self._colors[j]):
+                    if c > 0:
+                        yield (i, j, c)
+
+    def full(self, i):
+        return self._rows[i] == self._full
+
+    def mask(self, coords):
+        key = tuple(coords)
+        masks = self._masks.get(key)
+        if masks is None:
+            masks = self._masks[key] = self._shift(key)
+        return masks
+
+    def _shift(self, coords):
+        # row masks of the figure, pre-shifted for every column it fits in
+        lo, hi = min(i for i, _ in coords), max(i for i, _ in coords)
+        rows = {}
+        for i, j in coords:
+            rows[j] = rows.get(j, 0) | (1 << (i - lo))
+
+        return {x: tuple((j, m << (x + lo)) for j, m in rows.items())
+                for x in range(-lo, self.width - hi)}
+
+    def intersects(self, x, y, coords):
+        rows = self.mask(coords).get(x)
+        if rows is None:
+            return True
+
+        for j, m in rows:
+            v = y + j
+            if not (0 <= v < self.height) or self._rows[v] & m:
+                return True
+
+        return False
+
+    def burn(self, x, y, coords, c):
+        for i, j in coords:
+            self.set(x + i, y + j, c)
+
+    def break_lines(self):
+        if self._full not in self._rows:
+            return 0
+
+        keep = [j for j, row in enumerate(self._rows) if row != self._full]
+        rows = [j for j, row in enumerate(self._rows) if row == self._full]
+        lines = len(rows)
+        self.dirty.update(range(rows[-1] + 1))
+
+        self._rows = [0] * lines + [self._rows[j] for j in keep]
+        self._colors = [[0] * self.width for _ in range(lines)] + [self._colors[j] for j in keep]
+        self._cleared(rows)
 
         return lines
@@ -1,28 +1,185 @@
-import base64, datetime, json
-from typing import TypedDict
-
-from container import AutoContainer
+import argparse, base64, datetime, json, os, sqlite3, sys
+from typing import Iterable, Iterator, TypedDict
 
 class ScoreItem(TypedDict):
     name: str
     score: int
-    date: datetime.datetime
+    date: str
 
-class HighScores(AutoContainer[ScoreItem]):
-    _filename = 'scores.dat'
+class HighScores:
+    # scores per bucket of this width are counted by triggers, a rank sums the buckets above
+    # and only scans the scores within its own bucket
+    BUCKET = 1000
 
-    @staticmethod
-    def _parse_data(data: str) -> list[ScoreItem]:
-        return json.loads(base64.b64decode(data))
+    _filename = 'scores.db'
+    _legacy = 'scores.dat'
+    _db: sqlite3.Connection|None = None
+    _version: int = 0
 
-    @staticmethod
-    def _serialize_data() -> str:
-        return base64.b64encode(json.dumps(HighScores._get_data()).encode('utf-8')).decode()
+    @classmethod
+    def version(cls) -> int:
+        return cls._version
+
+    @classmethod
+    def _connect(cls) -> sqlite3.Connection:
+        # opened on first use, indexed on score so queries never load the whole table
+        if cls._db is None:
+            cls._db = sqlite3.connect(cls._filename)
+            cls._db.execute("PRAGMA journal_mode=WAL")
+            cls._db.execute("PRAGMA synchronous=NORMAL")
+            cls._db.executescript("""
+                CREATE TABLE IF NOT EXISTS scores (id INTEGER PRIMARY KEY, name TEXT NOT NULL, score INTEGER NOT NULL, date TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS scores_score ON scores (score DESC, id);
+                CREATE INDEX IF NOT EXISTS scores_name ON scores (name, score DESC);
+            """)
+            cls._create_buckets(cls._db)
+            cls._migrate(cls._db)
+
+        return cls._db
+
+    @classmethod
+    def _create_buckets(cls, db: sqlite3.Connection):
+        exists = db.execute("SELECT 1 FROM sqlite_master WHERE name = 'score_buckets'").fetchone()
+        with db:
+            db.executescript(f"""
+                CREATE TABLE IF NOT EXISTS score_buckets (bucket INTEGER PRIMARY KEY, n INTEGER NOT NULL);
+                CREATE TRIGGER IF NOT EXISTS scores_insert AFTER INSERT ON scores BEGIN
+                    INSERT INTO score_buckets VALUES (NEW.score / {cls.BUCKET}, 1) ON CONFLICT (bucket) DO UPDATE SET n = n + 1;
+                END;
+                CREATE TRIGGER IF NOT EXISTS scores_delete AFTER DELETE ON scores BEGIN
+                    UPDATE score_buckets SET n = n - 1 WHERE bucket = OLD.score / {cls.BUCKET};
+                END;
+            """)
+            # stores from before the buckets are counted once
+            if not exists:
+                db.execute(f"INSERT INTO score_buckets SELECT score / {cls.BUCKET}, COUNT(*) FROM scores GROUP BY 1")
+
+    @classmethod
+    def _migrate(cls, db: sqlite3.Connection):
+        # scores.dat held base64 encoded json, imported once and then moved aside
+        if not os.path.exists(cls._legacy):
+            return
+
+        try:
+            with open(cls._legacy, 'r') as f:
+                items = json.loads(base64.b64decode(f.read()))
+        except (IOError, ValueError) as e:
+            print(f"error: {cls._legacy}: {e}")
+            return
+
+        with db:
+            db.executemany("INSERT INTO scores (name, score, date) VALUES (?, ?, ?)",
+                           [(i['name'], i['score'], str(i.get('date', ''))) for i in items])
+        os.replace(cls._legacy, cls._legacy + '.migrated')
+        cls._version += 1
+
+    @classmethod
+    def close(cls):
+        if cls._db is not None:
+            cls._db.close()
+            cls._db = None
 
     @staticmethod
     def _create_item(name: str, score: int) -> ScoreItem:
-        return {"name": name, "score": score, "date": datetime.datetime.now()}
+        return {"name": name, "score": score, "date": datetime.datetime.now().isoformat(timespec='seconds')}
 
     @staticmethod
     def _parse_item(item: ScoreItem) -> dict:
         return {"name": item['name'], "value": item['score']}
+
+    @classmethod
+    def add_item(cls, **kwargs) -> bool:
+        return cls.add_items([cls._create_item(**kwargs)])
+
+    @classmethod
+    def add_items(cls, items: Iterable[ScoreItem]) -> bool:
+        try:
+            with cls._connect() as db:
+                db.executemany("INSERT INTO scores (name, score, date) VALUES (:name, :score, :date)", items)
+        except sqlite3.Error as e:
+            print(f"error: {e}")
+            return False
+        finally:
+            cls._version += 1
+
+        return True
+
+    @classmethod
+    def count(cls) -> int:
+        return cls._connect().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    @classmethod
+    def top(cls, n: int = 10, offset: int = 0) -> list[ScoreItem]:
+        rows = cls._connect().execute("SELECT name, score, date FROM scores ORDER BY score DESC, id LIMIT ? OFFSET ?", (n, offset))
+        return [{"name": name, "score": score, "date": date} for name, score, date in rows]
+
+    @classmethod
+    def items(cls, n: int = 100) -> Iterator[dict]:
+        for i in cls.top(n):
+            yield cls._parse_item(i)
+
+    @classmethod
+    def rank(cls, score: int) -> int:
+        # position a score would take, 1 is the best. Scores are not negative.
+        bucket = score // cls.BUCKET
+        db = cls._connect()
+        above = db.execute("SELECT COALESCE(SUM(n), 0) FROM score_buckets WHERE bucket > ?", (bucket,)).fetchone()[0]
+        near = db.execute("SELECT COUNT(*) FROM scores WHERE score > ? AND score < ?",
+                          (score, (bucket + 1) * cls.BUCKET)).fetchone()[0]
+        return above + near + 1
+
+    @classmethod
+    def best(cls, name: str) -> ScoreItem|None:
+        row = cls._connect().execute("SELECT name, score, date FROM scores WHERE name = ? ORDER BY score DESC LIMIT 1",
+                                     (name,)).fetchone()
+        return {"name": row[0], "score": row[1], "date": row[2]} if row is not None else None
+
+    @classmethod
+    def compact(cls, keep: int = 1000) -> int:
+        # keeps the best scores overall and the best score of every player
+        db = cls._connect()
+        with db:
+            removed = db.execute("""
+                DELETE FROM scores WHERE id NOT IN (SELECT id FROM scores ORDER BY score DESC, id LIMIT ?)
+                AND id NOT IN (SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY name ORDER BY score DESC, id) AS r
+                                               FROM scores) WHERE r = 1)
+            """, (keep,)).rowcount
+        db.execute("VACUUM")
+        cls._version += 1
+        return removed
+
+def main(args):
+    parser = argparse.ArgumentParser(description="query and maintain the high score store")
+    parser.add_argument('--db', default=HighScores._filename)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('top').add_argument('-n', type=int, default=10)
+    sub.add_parser('rank').add_argument('score', type=int)
+    sub.add_parser('best').add_argument('name')
+    sub.add_parser('compact').add_argument('--keep', type=int, default=1000)
+    p = sub.add_parser('import', help="import the json lines written by sim.py -o")
+    p.add_argument('file')
+    p.add_argument('--name', default='sim')
+    opts = parser.parse_args(args)
+
+    HighScores._filename = opts.db
+    match opts.command:
+        case 'top':
+            for i, s in enumerate(HighScores.top(opts.n)):
+                print(f"{i + 1:4}  {s['name']:12} {s['score']:8}  {s['date']}")
+        case 'rank':
+            print(HighScores.rank(opts.score))
+        case 'best':
+            print(HighScores.best(opts.name))
+        case 'compact':
+            print(f"removed {HighScores.compact(opts.keep)} scores")
+        case 'import':
+            with open(opts.file) as f:
+                date = datetime.datetime.now().isoformat(timespec='seconds')
+                items = [{"name": opts.name, "score": json.loads(line)['score'], "date": date} for line in f if line.strip()]
+            HighScores.add_items(items)
+            print(f"imported {len(items)} scores")
+
+    HighScores.close()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
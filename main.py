@@ -1,19 +1,38 @@
+import time
+START = time.perf_counter()
+
 from app import App, AppCode
 from component import BaseComponent
 from factory import BaseFactory
-import sys
+import argparse, sys
 
 class ComponentFactory(BaseFactory[BaseComponent]):
     _module = ['menu', 'tetris']
     _mapping = {
         'menu': 'MenuStructure',
-        'game': 'Tetris'
+        'game': 'Tetris',
+        'replay': 'ReplayPlayer',
+        'auto': 'AutoPlayer'
     }
 
 def main(args):
-    app = App('FTetris', 400, 600)
-    name = 'menu'
-    kwords = {"screen": app.screen}
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int, help="seed for every new game")
+    parser.add_argument('--record', metavar='DIR', help="record a replay of every game into DIR")
+    parser.add_argument('--export', metavar='DIR', help="record every transition of every game into DIR as training data")
+    parser.add_argument('--replay', metavar='FILE', help="watch a recorded game")
+    parser.add_argument('--auto', action='store_true', help="watch the built-in autoplayer")
+    parser.add_argument('--trace', metavar='FILE', help="write a chrome trace of every frame, F3 shows the frame times")
+    parser.add_argument('--startup-time', action='store_true', help="report the time to the first frame and quit")
+    parser.add_argument('--speed', type=int, default=1, choices=[1, 4, 16], help="replay speed")
+    opts = parser.parse_args(args)
+
+    app = App('FTetris', 400, 600, trace=opts.trace, startup=START if opts.startup_time else None)
+    name = 'menu' if opts.replay is None else 'replay'
+    kwords = {"screen": app.screen} if opts.replay is None else {'source': opts.replay, 'speed': opts.speed}
+    if opts.auto:
+        name = 'auto'
+        kwords = {'width': 10, 'height': 20, 'seed': opts.seed, 'budget': app.budget}
 
     while True:
         app.set_component(ComponentFactory.create(name, kwords))
@@ -24,7 +43,8 @@ def main(args):
                 sys.exit()
             case AppCode.EXIT:
                 match name:
-                    case 'menu':
+                    case 'menu' | 'replay' | 'auto':
+                        app.quit()
                         sys.exit()
                     case 'game':
                         name = 'menu'
@@ -32,7 +52,7 @@ def main(args):
 
             case AppCode.START:
                 name = 'game'
-                kwords = {'width': 10, 'height': 20}
+                kwords = {'width': 10, 'height': 20, 'seed': opts.seed, 'record': opts.record, 'export': opts.export}
 
 if __name__ == '__main__':
     main(sys.argv[1:])
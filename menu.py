@@ -6,7 +6,7 @@ from selector import BaseSelector, SelectorFactory
 from settings import AppSettings
 
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 import pygame as pg
@@ -24,19 +24,59 @@ class MenuItem:
 @dataclass
 class BaseMenu(ABC):
     index: int = 0
+    top: int = 0
+    page: int = 10
+    _items: list[MenuItem]|None = field(default=None, repr=False)
+    _version: int|None = field(default=None, repr=False)
 
     @abstractmethod
-    def items(self) -> list[MenuItem]: ...
+    def build(self) -> list[MenuItem]: ...
+
+    def version(self) -> int|None:
+        return None
+
+    def items(self) -> list[MenuItem]:
+        # built once and kept until the source data changes. The version is read after building,
+        # building may load the data and change it.
+        if self._items is None or self.version() != self._version:
+            self._items = self.build()
+            self._version = self.version()
+            self.index = min(self.index, self.count() - 1)
+
+        return self._items
+
+    def count(self) -> int:
+        return len(self.items())
+
+    def rows(self, window: range) -> list[MenuItem]:
+        items = self.items()
+        return [items[i] for i in window]
 
     @property
     def item(self):
-        return self.items()[self.index]
+        return self.rows(range(self.index, self.index + 1))[0]
+
+    def window(self, rows: int) -> range:
+        # the rows on screen, scrolled just enough to keep the selection visible
+        n = self.count()
+        self.top = max(0, min(self.top, self.index, n - rows))
+        self.top = max(self.top, self.index - rows + 1)
+        return range(self.top, min(self.top + rows, n))
 
     def handle_key(self, key: int) -> int:
+        n = self.count()
         if key == pg.K_UP:
-            self.index = (self.index - 1) % len(self.items())
+            self.index = (self.index - 1) % n
         elif key == pg.K_DOWN:
-            self.index = (self.index + 1) % len(self.items())
+            self.index = (self.index + 1) % n
+        elif key == pg.K_PAGEUP:
+            self.index = max(self.index - self.page, 0)
+        elif key == pg.K_PAGEDOWN:
+            self.index = min(self.index + self.page, n - 1)
+        elif key == pg.K_HOME:
+            self.index = 0
+        elif key == pg.K_END:
+            self.index = n - 1
         elif key in [pg.K_LEFT, pg.K_RIGHT] and self.item.effect == "select":
             self.item.handle_key(key)
         else:
@@ -45,18 +85,46 @@ class BaseMenu(ABC):
         return AppCode.OK
 
 class MainMenu(BaseMenu):
-    def items(self) -> list[MenuItem]:
+    def build(self) -> list[MenuItem]:
         return [MenuItem("New game", "start"),
                 MenuItem("High scores", "menu", "highscores"),
                 MenuItem("Settings", "menu", "settings"),
                 MenuItem("Quit", "quit")]
 
 class HighScoresMenu(BaseMenu):
-    def items(self) -> list[MenuItem]:
-        return [MenuItem("Back", "quit")] + [MenuItem(f"{s['name'].upper()} : {s['value']}") for s in HighScores.items()]
+    # scores are not built into items, only the rows on screen are fetched
+    _counted: tuple[int, int]|None = None
+    _page: tuple[tuple, list[MenuItem]]|None = None
+
+    def version(self) -> int:
+        return HighScores.version()
+
+    def build(self) -> list[MenuItem]:
+        return [MenuItem("Back", "quit")]
+
+    def count(self) -> int:
+        version = self.version()
+        if self._counted is None or self._counted[0] != version:
+            self._counted = (version, HighScores.count())
+
+        return len(self.items()) + self._counted[1]
+
+    def rows(self, window: range) -> list[MenuItem]:
+        items = self.items()
+        key = (self.version(), window.start, window.stop)
+        if self._page is None or self._page[0] != key:
+            start = max(window.start - len(items), 0)
+            scores = HighScores.top(max(window.stop - len(items) - start, 0), start)
+            self._page = (key, [items[i] for i in window if i < len(items)] +
+                          [MenuItem(f"{s['name'].upper()} : {s['score']}") for s in scores])
+
+        return self._page[1]
 
 class SettingsMenu(BaseMenu):
-    def items(self) -> list[MenuItem]:
+    def version(self) -> int:
+        return AppSettings.version()
+
+    def build(self) -> list[MenuItem]:
         return [MenuItem("Back", "quit")] + [MenuItem(f"{v} : {v}", "select", selector=SelectorFactory.create(v)) for v in AppSettings.items()]
 
 class MenuFactory(BaseFactory[BaseMenu]):
@@ -69,14 +137,16 @@ class MenuFactory(BaseFactory[BaseMenu]):
 
 @dataclass
 class MenuStructure(BaseComponent):
-    menu: BaseMenu = MenuFactory.create("main")
+    menu: BaseMenu = field(default_factory=lambda: MenuFactory.create("main"))
 
     def draw(self) -> bool:
         BaseComponent.screen.fill(self.theme.get_color("background"))
 
-        # draw fixed items
-        for i, s in enumerate(self.menu.items()):
-            self.draw_text(s.title.upper(), DrawCode.CENTER, BaseComponent.screen.get_height() // 2 - (len(self.menu.items()) // 2 - i) * 30,
+        # only the visible rows are drawn, long lists scroll
+        height = BaseComponent.screen.get_height()
+        window = self.menu.window((height - 60) // 30)
+        for i, item in zip(window, self.menu.rows(window)):
+            self.draw_text(item.title.upper(), DrawCode.CENTER, height // 2 - (len(window) // 2 - i + window.start) * 30,
                            self.theme.get_color("text" if i != self.menu.index else "selection"))
 
         return True
@@ -0,0 +1,50 @@
+from autoplay import BeamSearch
+from consts import Action
+from engine import Engine
+from factory import BaseFactory
+
+from abc import ABC, abstractmethod
+from random import Random
+
+class BasePolicy(ABC):
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def act(self, engine: Engine, random: Random) -> Action: ...
+
+class RandomPolicy(BasePolicy):
+    actions = [Action.TICK, Action.LEFT, Action.RIGHT, Action.ROTATE, Action.DOWN, Action.DROP]
+
+    def act(self, engine: Engine, random: Random) -> Action:
+        return random.choice(self.actions)
+
+class DropPolicy(BasePolicy):
+    actions = [Action.LEFT, Action.RIGHT, Action.ROTATE]
+
+    def act(self, engine: Engine, random: Random) -> Action:
+        return random.choice(self.actions) if random.random() < 0.8 else Action.DROP
+
+class BeamPolicy(BasePolicy):
+    def __init__(self):
+        # no time budget, so results only depend on the seed
+        self.player = BeamSearch(budget=None)
+        self.plan: list[Action] = []
+
+    def reset(self):
+        self.plan = []
+
+    def act(self, engine: Engine, random: Random) -> Action:
+        if not self.plan:
+            p = self.player.best(engine.grid, engine.figure, engine.nextfigure.kind)
+            self.plan = list(reversed(p.path)) if p is not None else [Action.DROP]
+
+        return self.plan.pop()
+
+class PolicyFactory(BaseFactory[BasePolicy]):
+    _module = 'policy'
+    _mapping = {
+        'random': 'RandomPolicy',
+        'drop': 'DropPolicy',
+        'beam': 'BeamPolicy'
+    }
@@ -0,0 +1,116 @@
+from collections import deque
+import json, time
+from typing import TextIO
+
+import pygame as pg
+
+PHASES = ('update', 'events', 'keys', 'display', 'sleep', 'draw')
+
+def percentile(values: list[float], p: float) -> float:
+    return values[min(int(p * len(values)), len(values) - 1)] if values else 0.
+
+class FrameProfiler:
+    def __init__(self, budget: float|None, window: int = 600, trace: str|None = None):
+        self.budget = budget
+        self.frames = 0
+        self.missed = 0
+        self.samples: dict[str, deque[float]] = {name: deque(maxlen=window) for name in PHASES + ('frame',)}
+        self.current = dict.fromkeys(PHASES, 0.)
+        self.origin = self.start = self.last = time.perf_counter()
+
+        # chrome trace events are streamed, an unterminated array still loads in the viewer
+        self.trace: TextIO|None = None
+        if trace is not None:
+            self.trace = open(trace, 'w')
+            self.trace.write('[\n')
+
+    def begin(self):
+        self.start = self.last = time.perf_counter()
+        self.current = dict.fromkeys(PHASES, 0.)
+
+    def mark(self, phase: str):
+        # time since the previous mark is booked on the phase
+        now = time.perf_counter()
+        self.current[phase] += (now - self.last) * 1000
+
+        if self.trace is not None:
+            self.trace.write(json.dumps({"name": phase, "ph": "X", "pid": 0, "tid": 0,
+                                         "ts": (self.last - self.origin) * 1e6, "dur": (now - self.last) * 1e6}) + ',\n')
+        self.last = now
+
+    def end(self):
+        total = (self.last - self.start) * 1000
+        for name, ms in self.current.items():
+            self.samples[name].append(ms)
+        self.samples['frame'].append(total)
+
+        self.frames += 1
+        if self.budget is not None and total - self.current['sleep'] > self.budget:
+            self.missed += 1
+
+    def percentiles(self, name: str) -> tuple[float, float, float]:
+        values = sorted(self.samples[name])
+        return percentile(values, .5), percentile(values, .95), percentile(values, .99)
+
+    def lines(self) -> list[str]:
+        lines = [f"{'':8}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for name in ('frame',) + PHASES:
+            lines.append(f"{name:8}" + "".join(f"{v:7.2f}" for v in self.percentiles(name)))
+
+        return lines + [f"missed {self.missed} / {self.frames}"]
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.write(json.dumps({"name": "session", "ph": "i", "pid": 0, "tid": 0, "s": "g",
+                                         "ts": (time.perf_counter() - self.origin) * 1e6}) + '\n]\n')
+            self.trace.close()
+            self.trace = None
+
+class PerfHud:
+    def __init__(self, profiler: FrameProfiler, interval: float = 250.):
+        self.profiler = profiler
+        self.interval = interval
+        self.visible = False
+        self.rect: pg.Rect|None = None
+        self.surface: pg.Surface|None = None
+        self.under: tuple[pg.Surface, pg.Rect]|None = None
+        self.updated = 0.
+        self.font = pg.font.Font(None, 18)
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def render(self):
+        # the numbers are re-rendered a few times per second, not every frame
+        lines = [self.font.render(line, True, (255, 255, 255)) for line in self.profiler.lines()]
+        self.surface = pg.Surface((max(l.get_width() for l in lines) + 8, 14 * len(lines) + 6))
+        self.surface.fill((0, 0, 0))
+        for i, l in enumerate(lines):
+            self.surface.blit(l, (4, 4 + 14 * i))
+        self.surface.set_alpha(200)
+
+    def draw(self, screen: pg.Surface):
+        if not self.visible:
+            return
+
+        now = time.perf_counter() * 1000
+        if self.surface is None or now - self.updated >= self.interval:
+            self.render()
+            self.updated = now
+
+        # keep what is underneath, components may only redraw what changed
+        self.rect = self.surface.get_rect(topleft=(4, 4)).clip(screen.get_rect())
+        self.under = (screen.subsurface(self.rect).copy(), self.rect)
+        screen.blit(self.surface, self.rect)
+
+    def restore(self, screen: pg.Surface):
+        if self.under is not None:
+            screen.blit(*self.under)
+            self.under = None
+
+    def dirty(self) -> pg.Rect|None:
+        # the last rect stays dirty for one more frame after hiding
+        rect = self.rect
+        if not self.visible:
+            self.rect = None
+        return rect
@@ -0,0 +1,129 @@
+from component import BaseComponent
+from consts import State
+from figure import Figure
+from grid import Grid
+
+import pygame as pg
+
+class Renderer:
+    background: pg.Surface|None = None
+    layer: pg.Surface
+    grid: Grid
+
+    def __init__(self, tetris):
+        self.tetris = tetris
+        self.state: State|None = None
+        self.figure: list[pg.Rect] = []
+        self.ghost: list[pg.Rect] = []
+        self.nextfigure: list[pg.Rect] = []
+        self.text = ""
+        self.textrect = pg.Rect(0, 0, 0, 0)
+        self.textsurface: pg.Surface|None = None
+
+    def invalidate(self):
+        self.background = None
+
+    def cells(self, figure: Figure, x: int, y: int) -> list[pg.Rect]:
+        s = self.tetris.size
+        return [pg.Rect(x + s * (i + figure.x) + 1, y + s * (j + figure.y) + 1, s, s) for i, j in figure.coords]
+
+    def build(self):
+        t = self.tetris
+        self.background = pg.Surface(BaseComponent.screen.get_size())
+        self.background.fill(t.theme.get_color("background"))
+
+        # draw grid
+        for i in range(t.grid.height + 1):
+            pg.draw.line(self.background, t.theme.get_color("line"),
+                         (t.x, t.y + t.size * i), (t.x + t.size * t.grid.width, t.y + t.size * i))
+        for j in range(t.grid.width + 1):
+            pg.draw.line(self.background, t.theme.get_color("line"),
+                         (t.x + t.size * j, t.y), (t.x + t.size * j, t.y + t.size * t.grid.height))
+
+        # fill non-zero
+        self.layer = self.background.copy()
+        self.grid = t.grid
+        t.draw_cells(list(t.grid.nonzero()), self.layer)
+        t.grid.dirty.clear()
+
+    def draw_rows(self, rows: set[int]) -> list[pg.Rect]:
+        t, rects = self.tetris, []
+
+        for j in sorted(rows):
+            # blocks cover the grid line below them, the line above belongs to the previous row
+            r = pg.Rect(t.x, t.y + t.size * j + 1, t.size * t.grid.width + 1, t.size)
+            self.layer.blit(self.background, r, r)
+            t.draw_cells([(i, j, c) for i in range(t.grid.width) if (c := t.grid.get(i, j)) > 0], self.layer)
+            rects.append(r)
+
+        rows.clear()
+        return rects
+
+    def render_text(self, text: str) -> pg.Rect:
+        screen = BaseComponent.screen
+        self.text = text
+        self.textsurface = self.tetris.render_text(text, self.tetris.theme.get_color("text"))
+        return pg.Rect((screen.get_width() - self.textsurface.get_width()) // 2, screen.get_height() - 30,
+                       self.textsurface.get_width(), self.textsurface.get_height())
+
+    def draw(self) -> list[pg.Rect]|None:
+        t, screen = self.tetris, BaseComponent.screen
+        full = self.background is None or self.background.get_size() != screen.get_size() or t.grid is not self.grid
+        if full:
+            self.build()
+
+        rows = self.draw_rows(t.grid.dirty) if t.grid.dirty else []
+        figure = self.cells(t.figure, t.x, t.y)
+        landing = t.engine.landing() if t.ghost and t.state in (State.START, State.RUNNING) else None
+        ghost = self.cells(t.figure, t.x, t.y + t.size * (landing - t.figure.y)) if landing is not None else []
+        nextfigure = self.cells(t.nextfigure, 30, 50)
+        text = f"Level: {t.level:2}  Score: {t.score}"
+
+        changed = bool(rows) or figure != self.figure or ghost != self.ghost or nextfigure != self.nextfigure or text != self.text
+        overlay = t.state in (State.PAUSE, State.GAMEOVER)
+
+        # state changes and overlay screens are rare, redraw everything
+        if full or t.state != self.state or (overlay and changed):
+            self.state, self.figure, self.ghost, self.nextfigure = t.state, figure, ghost, nextfigure
+            if text != self.text or self.textsurface is None:
+                self.textrect = self.render_text(text)
+
+            screen.blit(self.layer, (0, 0))
+            if landing is not None:
+                t.draw_ghost(t.figure, landing)
+            t.draw_figure(t.figure, t.x, t.y)
+            t.draw_figure(t.nextfigure, 30, 50)
+            t.draw_texts()
+            return None
+
+        if not changed:
+            return []
+
+        rects = rows
+        if figure != self.figure:
+            rects += self.figure + figure
+
+        # the ghost is blended, it can only be drawn again over a restored layer
+        moved = ghost != self.ghost or any(r.collidelist(ghost) >= 0 for r in rects)
+        if moved:
+            rects += self.ghost + ghost
+        if nextfigure != self.nextfigure:
+            rects += self.nextfigure + nextfigure
+        if text != self.text:
+            rects += [self.textrect]
+            self.textrect = self.render_text(text)
+            rects += [self.textrect]
+
+        # restore the locked layer under everything that changed, then draw the moving parts on top
+        for r in rects:
+            screen.blit(self.layer, r, r)
+
+        if landing is not None and moved:
+            t.draw_ghost(t.figure, landing)
+        t.draw_figure(t.figure, t.x, t.y)
+        t.draw_figure(t.nextfigure, 30, 50)
+        if self.textsurface is not None and self.textrect.collidelist(rects) >= 0:
+            screen.blit(self.textsurface, self.textrect)
+
+        self.figure, self.ghost, self.nextfigure = figure, ghost, nextfigure
+        return rects
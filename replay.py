@@ -0,0 +1,86 @@
+from consts import Action, State
+from engine import Engine
+from grid import BitGrid
+
+import argparse, os, struct, sys, time
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator
+
+MAGIC = b'PTRP'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHQ')
+RECORD = struct.Struct('<IB')
+
+@dataclass
+class ReplayHeader:
+    width: int
+    height: int
+    seed: int
+
+class ReplayWriter:
+    def __init__(self, filename: str, width: int, height: int, seed: int):
+        self.filename = filename
+        self.file: BinaryIO|None = open(filename, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height, seed))
+
+    def write(self, t: int, action: Action):
+        if self.file is not None:
+            self.file.write(RECORD.pack(t, action))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def read_header(f: BinaryIO) -> ReplayHeader:
+    magic, version, width, height, seed = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a replay file (version {version})")
+
+    return ReplayHeader(width, height, seed)
+
+def read_actions(f: BinaryIO) -> Iterator[tuple[int, Action]]:
+    # a truncated last record is ignored, the game may still be in progress
+    data = f.read()
+    for t, action in RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]):
+        yield t, Action(action)
+
+def load(filename: str) -> tuple[ReplayHeader, list[tuple[int, Action]]]:
+    with open(filename, 'rb') as f:
+        return read_header(f), list(read_actions(f))
+
+def simulate(filename: str) -> Engine:
+    with open(filename, 'rb') as f:
+        header = read_header(f)
+        engine = Engine(header.width, header.height, header.seed, BitGrid)
+
+        for _, action in read_actions(f):
+            engine.step(action)
+
+    return engine
+
+def main(args):
+    parser = argparse.ArgumentParser(description="re-simulate replays headless and verify their scores")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--score', type=int, help="expected score, exits with 1 on a mismatch")
+    opts = parser.parse_args(args)
+
+    ok = True
+    for filename in opts.files:
+        start = time.perf_counter()
+        try:
+            engine = simulate(filename)
+        except (IOError, ValueError, struct.error) as e:
+            print(f"error: {filename}: {e}")
+            ok = False
+            continue
+
+        over = "game over" if engine.state == State.GAMEOVER else "in progress"
+        print(f"{os.path.basename(filename)}: score {engine.score}  lines {engine.lines}  pieces {engine.pieces}  "
+              f"({over}, {time.perf_counter() - start:.3f}s)")
+        ok = ok and (opts.score is None or engine.score == opts.score)
+
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
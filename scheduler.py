@@ -0,0 +1,21 @@
+class Scheduler:
+    def __init__(self, step: float, max_steps: int = 25):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.
+
+    def reset(self):
+        self.accumulator = 0.
+
+    def advance(self, dt: float) -> int:
+        self.accumulator += dt
+        steps = int(self.accumulator // self.step)
+
+        # after a stall, run a bounded number of steps and drop the rest of the backlog
+        if steps > self.max_steps:
+            self.accumulator %= self.step
+            return self.max_steps
+
+        self.accumulator -= steps * self.step
+        return steps
+
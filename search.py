@@ -0,0 +1,97 @@
+from cache import LRUCache
+from consts import Action
+from figure import Figure, Shape, SHAPES
+from grid import Grid
+
+from collections import deque
+from dataclasses import dataclass
+
+@dataclass(frozen=True, slots=True)
+class Placement:
+    x: int
+    y: int
+    rotation: int
+    path: tuple[Action, ...]
+
+class MoveSearch:
+    def __init__(self, maxsize: int = 4096):
+        self.cache: LRUCache[int, tuple[Placement, ...]] = LRUCache(maxsize)
+
+    def placements(self, grid: Grid, figure: Figure) -> tuple[Placement, ...]:
+        key = grid.position_key(figure.kind, figure.rotation, figure.x, figure.y)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.search(grid, figure.kind, figure.rotation, figure.x, figure.y)
+            self.cache.put(key, result)
+
+        return result
+
+    @staticmethod
+    def search(grid: Grid, kind: int, rotation: int, x: int, y: int) -> tuple[Placement, ...]:
+        shape = SHAPES[kind]
+        if grid.intersects(x, y, shape.coords[rotation]):
+            return ()
+
+        start = (x, y, rotation)
+        coords, rotations, intersects = shape.coords, shape.rotations, grid.intersects
+        prefix = MoveSearch.seeds(grid, shape, start)
+
+        # breadth first over (x, y, rotation) from the seed states
+        parents: dict[tuple, tuple|None] = dict.fromkeys(prefix)
+        queue = deque(prefix)
+        result, cells = [], set()
+
+        while queue:
+            state = queue.popleft()
+            x, y, r = state
+
+            for action, n in ((Action.LEFT, (x - 1, y, r)), (Action.RIGHT, (x + 1, y, r)),
+                              (Action.ROTATE, (x, y, (r + 1) % rotations)), (Action.DOWN, (x, y + 1, r))):
+                if n in parents:
+                    continue
+
+                if intersects(n[0], n[1], coords[n[2]]):
+                    if action == Action.DOWN:
+                        # resting state, a final down locks the figure
+                        c = tuple(sorted((x + i, y + j) for i, j in coords[r]))
+                        if c not in cells:
+                            cells.add(c)
+                            result.append(Placement(x, y, r, MoveSearch.path(parents, prefix, state) + (Action.DOWN,)))
+                    continue
+
+                parents[n] = (state, action)
+                queue.append(n)
+
+        return tuple(result)
+
+    @staticmethod
+    def seeds(grid: Grid, shape: Shape, start: tuple) -> dict[tuple, tuple[Action, ...]]:
+        x, y, rotation = start
+        rotations = [(rotation + k) % shape.rotations for k in range(shape.rotations)]
+        lowest = {r: grid.height - grid.max_height - 1 - shape.bounds[r][3] for r in rotations}
+
+        # the figure has to rotate in place at the start to use the shortcut
+        if min(lowest.values()) < y or any(grid.intersects(x, y, shape.coords[r]) for r in rotations):
+            return {start: ()}
+
+        # above the stack every state is free, so seed the search with all of them
+        # in the rows just above the stack instead of walking there one move at a time
+        seeds, lo = {}, min(lowest.values())
+        for k, r in enumerate(rotations):
+            for dx, action in ((-1, Action.LEFT), (1, Action.RIGHT)):
+                u = x if dx < 0 else x + 1
+                while not grid.intersects(u, y, shape.coords[r]):
+                    for v in range(lo, lowest[r] + 1):
+                        seeds[(u, v, r)] = (Action.ROTATE,) * k + (action,) * abs(u - x) + (Action.DOWN,) * (v - y)
+                    u += dx
+
+        return seeds
+
+    @staticmethod
+    def path(parents: dict[tuple, tuple|None], prefix: dict[tuple, tuple[Action, ...]], state: tuple) -> tuple[Action, ...]:
+        actions = []
+        while (p := parents[state]) is not None:
+            state, action = p
+            actions.append(action)
+
+        return prefix[state] + tuple(reversed(actions))
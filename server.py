@@ -0,0 +1,250 @@
+from consts import Action, State
+from engine import Engine, gravity
+from grid import BitGrid
+
+import argparse, asyncio, json, random, sys, time
+from dataclasses import dataclass, field
+
+# line based json: clients send {"action": "left"}, the server answers with state messages
+ACTIONS = {a.name.lower(): a for a in Action if a != Action.TICK}
+
+class Session:
+    def __init__(self, writer: asyncio.StreamWriter, seed: int, width: int, height: int):
+        self.writer = writer
+        self.engine = Engine(width, height, seed, BitGrid)
+        self.elapsed = 0.
+        self.rows: set[int] = set(range(height))
+        self.changed = asyncio.Event()
+        self.changed.set()
+
+    def act(self, action: Action):
+        if self.engine.step(action):
+            self.touch()
+
+    def tick(self, ms: float):
+        self.elapsed += ms
+        g = gravity(self.engine.level)
+        while self.elapsed >= g:
+            self.elapsed -= g
+            self.act(Action.TICK)
+
+    def touch(self):
+        # rows of the board are only sent when they changed since the last message
+        self.rows |= self.engine.grid.dirty
+        self.engine.grid.dirty.clear()
+        self.changed.set()
+
+    def message(self) -> dict:
+        e, f = self.engine, self.engine.figure
+        m = {"type": "state", "state": int(e.state), "score": e.score, "lines": e.lines, "level": e.level,
+             "pieces": e.pieces, "figure": [f.kind, f.rotation, f.x, f.y], "next": e.nextfigure.kind}
+        if self.rows:
+            m["rows"] = {j: "".join(str(e.grid.get(x, j)) for x in range(e.width)) for j in self.rows}
+            self.rows = set()
+
+        return m
+
+    async def send(self):
+        # only the latest state is written, a slow client gets fewer updates instead of a backlog
+        while True:
+            await self.changed.wait()
+            self.changed.clear()
+
+            try:
+                self.writer.write((json.dumps(self.message()) + '\n').encode())
+                await self.writer.drain()
+            except ConnectionError:
+                return
+
+            if self.engine.state == State.GAMEOVER:
+                return
+
+@dataclass
+class Server:
+    width: int = 10
+    height: int = 20
+    tps: int = 60
+    # games are seeded by the server unless clients are trusted to pick their own seed
+    client_seeds: bool = False
+    sessions: set[Session] = field(default_factory=set)
+    ticks: int = 0
+    ticker: asyncio.Task|None = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            hello = json.loads((await reader.readline()).strip() or b'{}')
+        except json.JSONDecodeError as e:
+            hello = None
+            print(f"error: {e}")
+
+        if not isinstance(hello, dict):
+            writer.write((json.dumps({"type": "error", "error": "expected a json object to start"}) + '\n').encode())
+            writer.close()
+            return
+
+        seed = hello.get('seed') if self.client_seeds else None
+        if not isinstance(seed, int):
+            seed = random.getrandbits(32)
+        session = Session(writer, seed, self.width, self.height)
+        writer.write((json.dumps({"type": "start", "seed": seed, "width": self.width, "height": self.height}) + '\n').encode())
+        self.sessions.add(session)
+        sender = asyncio.create_task(session.send())
+
+        read = None
+        try:
+            buffer = b''
+            while True:
+                # everything that arrived is handled in one go instead of a line per wakeup,
+                # the connection is closed once the sender is done with a finished game
+                read = asyncio.ensure_future(reader.read(65536))
+                await asyncio.wait((read, sender), return_when=asyncio.FIRST_COMPLETED)
+                if not read.done():
+                    break
+
+                data = read.result()
+                if not data:
+                    break
+
+                *lines, buffer = (buffer + data).split(b'\n')
+                for line in lines:
+                    try:
+                        action = json.loads(line).get('action')
+                    except (json.JSONDecodeError, AttributeError) as e:
+                        print(f"error: {e}")
+                        continue
+
+                    action = ACTIONS.get(action) if isinstance(action, str) else None
+                    if action is not None:
+                        session.act(action)
+                        if session.engine.state == State.GAMEOVER:
+                            self.sessions.discard(session)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            if read is not None:
+                read.cancel()
+            sender.cancel()
+            self.sessions.discard(session)
+            writer.close()
+
+    async def tick(self):
+        # one timer for all sessions, gravity is applied to every game in a single pass
+        step = 1000 / self.tps
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(step / 1000)
+            now = time.perf_counter()
+            ms, last = (now - last) * 1000, now
+
+            for s in list(self.sessions):
+                s.tick(ms)
+                # finished games stop ticking, the sender still delivers the final state
+                if s.engine.state == State.GAMEOVER:
+                    self.sessions.discard(s)
+            self.ticks += 1
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 7777) -> asyncio.Server:
+        # thousands of clients may connect at once
+        server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        self.ticker = asyncio.create_task(self.tick())
+        return server
+
+@dataclass
+class Result:
+    seed: int
+    score: int
+    pieces: int
+    messages: int
+
+async def client(host: str, port: int, seed: int, rate: float = 50., max_pieces: int = 200) -> Result:
+    # a scripted stand-in for a real player, sends seeded random inputs at a fixed rate
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps({"seed": seed}) + '\n').encode())
+    script = random.Random(seed)
+    state, messages = {"score": 0, "pieces": 0}, 0
+
+    async def play():
+        while True:
+            action = script.choice(['left', 'right', 'rotate', 'drop']) if script.random() < 0.9 else 'down'
+            writer.write((json.dumps({"action": action}) + '\n').encode())
+            await writer.drain()
+            await asyncio.sleep(rate / 1000)
+
+    inputs = asyncio.create_task(play())
+    try:
+        while line := await reader.readline():
+            m = json.loads(line)
+            messages += 1
+            if m['type'] == 'state':
+                state = m
+                if m['state'] == State.GAMEOVER or m['pieces'] >= max_pieces:
+                    break
+    except ConnectionError as e:
+        print(f"error: {seed}: {e}")
+    finally:
+        inputs.cancel()
+        writer.close()
+
+    return Result(seed, state['score'], state['pieces'], messages)
+
+async def clients(host: str, port: int, games: int, rate: float, max_pieces: int) -> float:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(host, port, seed, rate, max_pieces) for seed in range(games)))
+    duration = time.perf_counter() - start
+
+    n = max(len(results), 1)
+    print(f"games: {len(results)}  mean score: {sum(r.score for r in results) / n:.1f}  "
+          f"pieces: {sum(r.pieces for r in results)}  messages: {sum(r.messages for r in results)}  "
+          f"wall time: {duration:.2f}s")
+    return duration
+
+async def loopback(games: int, port: int, rate: float, max_pieces: int, tps: int):
+    # scripted clients pick their seeds, so runs can be compared
+    server = Server(tps=tps, client_seeds=True)
+    s = await server.serve(port=port)
+
+    duration = await clients('127.0.0.1', s.sockets[0].getsockname()[1], games, rate, max_pieces)
+    print(f"ticks: {server.ticks} ({server.ticks / duration:.1f}/s, target {tps})")
+
+    s.close()
+    await s.wait_closed()
+
+def main(args):
+    parser = argparse.ArgumentParser(description="host headless games over tcp, one json message per line")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('serve')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=7777)
+    p.add_argument('--tps', type=int, default=60, help="gravity ticks per second")
+    p.add_argument('--client-seeds', action='store_true', help="let clients choose the seed of their game")
+    p = sub.add_parser('loopback', help="serve and play scripted clients over loopback")
+    p.add_argument('-n', '--games', type=int, default=100)
+    p.add_argument('--port', type=int, default=0)
+    p.add_argument('--tps', type=int, default=60)
+    p.add_argument('--rate', type=float, default=50., help="ms between client inputs")
+    p.add_argument('--max-pieces', type=int, default=50)
+    p = sub.add_parser('clients', help="play scripted clients against a running server")
+    p.add_argument('-n', '--games', type=int, default=100)
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=7777)
+    p.add_argument('--rate', type=float, default=50., help="ms between client inputs")
+    p.add_argument('--max-pieces', type=int, default=50)
+    opts = parser.parse_args(args)
+
+    match opts.command:
+        case 'serve':
+            async def serve():
+                s = await Server(tps=opts.tps, client_seeds=opts.client_seeds).serve(opts.host, opts.port)
+                async with s:
+                    await s.serve_forever()
+            try:
+                asyncio.run(serve())
+            except KeyboardInterrupt:
+                pass
+        case 'loopback':
+            asyncio.run(loopback(opts.games, opts.port, opts.rate, opts.max_pieces, opts.tps))
+        case 'clients':
+            asyncio.run(clients(opts.host, opts.port, opts.games, opts.rate, opts.max_pieces))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
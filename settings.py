@@ -14,10 +14,13 @@ class AppSettings(AutoContainer[BaseSelector]):
     _filename: str = 'settings.json'
     _data: list[dict[str, BaseSelector]] = []
 
-    _defaults: list[dict[str, BaseSelector]] = [{
-        "theme": SelectorFactory.create('str', {"items": [*GetThemes('/assets/', 'theme')]}),
-        "sound": SelectorFactory.create('bool')
-    }]
+    @classmethod
+    def _create_defaults(cls) -> list[dict[str, BaseSelector]]:
+        # built on first load, not at import
+        return [{
+            "theme": SelectorFactory.create('str', {"items": [*GetThemes('/assets/', 'theme')]}),
+            "sound": SelectorFactory.create('bool')
+        }]
 
     @staticmethod
     def _parse_data(data: str):
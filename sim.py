@@ -0,0 +1,166 @@
+from consts import State
+from engine import Engine
+from grid import BitGrid
+from policy import PolicyFactory
+
+import argparse, json, os, queue, signal, sys, time
+import multiprocessing as mp
+from dataclasses import asdict, dataclass
+from random import Random
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    from dataset import TransitionWriter
+
+@dataclass
+class GameResult:
+    seed: int
+    score: int
+    lines: int
+    level: int
+    pieces: int
+    duration: float
+
+@dataclass
+class Summary:
+    games: int = 0
+    score: int = 0
+    best: int = 0
+    lines: int = 0
+    pieces: int = 0
+    duration: float = 0.
+
+    def add(self, r: GameResult):
+        self.games += 1
+        self.score += r.score
+        self.best = max(self.best, r.score)
+        self.lines += r.lines
+        self.pieces += r.pieces
+        self.duration += r.duration
+
+    def __str__(self) -> str:
+        n = max(self.games, 1)
+        return (f"games: {self.games}  mean score: {self.score / n:.1f}  best: {self.best}  "
+                f"mean lines: {self.lines / n:.2f}  pieces: {self.pieces}  "
+                f"pieces/s/core: {self.pieces / max(self.duration, 1e-9):.0f}")
+
+def play(seed: int, policy: str, width: int = 10, height: int = 20, max_pieces: int = 10000,
+         writer: 'TransitionWriter|None' = None) -> GameResult:
+    engine = Engine(width, height, seed, BitGrid)
+    random = Random(seed)
+    p = PolicyFactory.create(policy)
+    p.reset()
+
+    start = time.perf_counter()
+    step = writer.step if writer is not None else lambda engine, action: engine.step(action)
+    while engine.state != State.GAMEOVER and engine.pieces < max_pieces:
+        step(engine, p.act(engine, random))
+
+    if writer is not None:
+        writer.end()
+
+    return GameResult(seed, engine.score, engine.lines, engine.level, engine.pieces, time.perf_counter() - start)
+
+def _worker(tasks: mp.Queue, results: mp.Queue, cancel, policy: str, width: int, height: int, max_pieces: int,
+            record: str|None = None):
+    # the parent handles ctrl-c and cancels through the event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    writer = None
+    if record is not None:
+        # numpy is only needed when recording
+        from dataset import TransitionWriter
+        writer = TransitionWriter(record, width, height)
+
+    try:
+        while not cancel.is_set():
+            chunk = tasks.get()
+            if chunk is None:
+                break
+
+            for seed in range(*chunk):
+                if cancel.is_set():
+                    break
+                results.put(play(seed, policy, width, height, max_pieces, writer))
+    finally:
+        if writer is not None:
+            writer.close()
+        results.put(None)
+
+def run(games: int, policy: str = 'drop', seed: int = 0, workers: int = 0, chunk: int = 16,
+        width: int = 10, height: int = 20, max_pieces: int = 10000, record: str|None = None) -> Iterator[GameResult]:
+    workers = workers or os.cpu_count() or 1
+    tasks, results, cancel = mp.Queue(), mp.Queue(), mp.Event()
+
+    for s in range(seed, seed + games, chunk):
+        tasks.put((s, min(s + chunk, seed + games)))
+    for _ in range(workers):
+        tasks.put(None)
+
+    procs = [mp.Process(target=_worker, args=(tasks, results, cancel, policy, width, height, max_pieces, record),
+                         daemon=True)
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+
+    running = workers
+    try:
+        while running:
+            r = results.get()
+            if r is None:
+                running -= 1
+            else:
+                yield r
+    finally:
+        cancel.set()
+        tasks.cancel_join_thread()
+
+        # drain the queue so workers can flush and exit
+        deadline = time.monotonic() + 5
+        while running and time.monotonic() < deadline:
+            try:
+                running -= results.get(timeout=0.1) is None
+            except queue.Empty:
+                pass
+
+        for p in procs:
+            p.join(timeout=1)
+            if p.is_alive():
+                p.terminate()
+
+def main(args):
+    parser = argparse.ArgumentParser(description="run headless games across all cores")
+    parser.add_argument('-n', '--games', type=int, default=1000)
+    parser.add_argument('-j', '--workers', type=int, default=0, help="worker processes, 0 for one per core")
+    parser.add_argument('-p', '--policy', default='drop', choices=PolicyFactory._mapping.keys())
+    parser.add_argument('-s', '--seed', type=int, default=0, help="first seed, games use consecutive seeds")
+    parser.add_argument('-c', '--chunk', type=int, default=16, help="seeds handed to a worker at a time")
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--height', type=int, default=20)
+    parser.add_argument('--max-pieces', type=int, default=10000)
+    parser.add_argument('-o', '--output', help="write per-game results as json lines, ordered by seed")
+    parser.add_argument('--record', metavar='DIR', help="record every transition into DIR, read with dataset.py")
+    opts = parser.parse_args(args)
+
+    summary, items = Summary(), []
+    start = time.perf_counter()
+
+    try:
+        for r in run(opts.games, opts.policy, opts.seed, opts.workers, opts.chunk, opts.width, opts.height, opts.max_pieces,
+                     opts.record):
+            summary.add(r)
+            if opts.output:
+                items.append(r)
+    except KeyboardInterrupt:
+        print("cancelled", file=sys.stderr)
+
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            for r in sorted(items, key=lambda r: r.seed):
+                f.write(json.dumps(asdict(r)) + '\n')
+
+    print(summary)
+    print(f"wall time: {time.perf_counter() - start:.2f}s")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
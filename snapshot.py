@@ -0,0 +1,108 @@
+from cache import LRUCache
+from figure import SHAPES
+
+import dataclasses, struct
+from collections import deque
+from dataclasses import dataclass
+from random import Random
+
+MAGIC = b'PTSS'
+VERSION = 1
+HEADER = struct.Struct('<4sBHHBIHIIIBBhhBQ')
+
+# random states by (seed, draws), snapshots of one game share them instead of holding a copy each
+_states: LRUCache[tuple[int, int], tuple] = LRUCache(1024)
+
+def random_state(seed: int, draws: int) -> tuple:
+    state = _states.get((seed, draws))
+    if state is None:
+        # replays the engine's figure draws
+        random = Random(seed)
+        for _ in range(draws):
+            random.randint(0, len(SHAPES) - 1)
+        state = random.getstate()
+        _states.put((seed, draws), state)
+
+    return state
+
+def keep_state(seed: int, draws: int, random: Random):
+    # saves replaying the draws when the snapshot is restored
+    if (seed, draws) not in _states:
+        _states.put((seed, draws), random.getstate())
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    width: int
+    height: int
+    board: bytes|memoryview
+    state: int
+    score: int
+    level: int
+    lines: int
+    pieces: int
+    draws: int
+    figure: tuple[int, int, int, int]
+    nextkind: int
+    seed: int|None
+    rng: tuple|None = None
+
+    def fork(self, **changes) -> 'Snapshot':
+        # immutable, so forks share the board until one of them changes it
+        return dataclasses.replace(self, **changes)
+
+    def get(self, x: int, y: int) -> int:
+        return self.board[y * self.width + x]
+
+    def set(self, x: int, y: int, c: int) -> 'Snapshot':
+        board = bytearray(self.board)
+        board[y * self.width + x] = c
+        return self.fork(board=bytes(board))
+
+    def random_state(self) -> tuple:
+        return self.rng if self.rng is not None else random_state(self.seed, self.draws)
+
+    def header(self) -> bytes:
+        if self.seed is None:
+            raise ValueError("only seeded games can be serialized")
+
+        return HEADER.pack(MAGIC, VERSION, self.width, self.height, self.state, self.score, self.level, self.lines,
+                           self.pieces, self.draws, *self.figure, self.nextkind, self.seed)
+
+    def write(self, f):
+        # header and board go out as they are, without joining them first
+        f.write(self.header())
+        f.write(self.board)
+
+    def tobytes(self) -> bytes:
+        return self.header() + self.board
+
+    @classmethod
+    def frombytes(cls, data: bytes|memoryview) -> 'Snapshot':
+        # the board stays a view into data, nothing is copied
+        magic, version, width, height, state, score, level, lines, pieces, draws, kind, rotation, x, y, nextkind, seed = \
+            HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a snapshot (version {version})")
+
+        board = memoryview(data)[HEADER.size:HEADER.size + width * height]
+        return cls(width, height, board, state, score, level, lines, pieces, draws, (kind, rotation, x, y), nextkind, seed)
+
+class UndoBuffer:
+    def __init__(self, size: int = 64):
+        self.snapshots: deque[Snapshot] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.snapshots)
+
+    def push(self, snapshot: Snapshot):
+        # the oldest snapshot drops out once the buffer is full
+        self.snapshots.append(snapshot)
+
+    def pop(self) -> Snapshot|None:
+        return self.snapshots.pop() if self.snapshots else None
+
+    def peek(self) -> Snapshot|None:
+        return self.snapshots[-1] if self.snapshots else None
+
+    def clear(self):
+        self.snapshots.clear()
@@ -0,0 +1,51 @@
+from theme import Color, Theme
+
+import pygame as pg
+
+def draw_block(surface: pg.Surface, color: Color, x: int, y: int, w: int, h: int):
+    pg.draw.rect(surface, color, (x, y, w, h))
+    pg.draw.line(surface, color.lighten(0.5), (x, y), (x, y + h))
+    pg.draw.line(surface, color.lighten(0.5), (x, y), (x + w, y))
+    pg.draw.line(surface, color.darken(0.5), (x + w, y), (x + w, y + h))
+    pg.draw.line(surface, color.darken(0.5), (x, y + h), (x + w, y + h))
+
+class SpriteAtlas:
+    def __init__(self):
+        self.sprites: dict[int, pg.Surface] = {}
+        self.ghosts: dict[int, pg.Surface] = {}
+        self.theme: Theme|None = None
+        self.size = 0
+
+    def invalidate(self):
+        self.sprites.clear()
+        self.ghosts.clear()
+        self.theme = None
+
+    def get(self, theme: Theme, idx: int, size: int) -> pg.Surface:
+        if theme is not self.theme or size != self.size:
+            self.sprites.clear()
+            self.ghosts.clear()
+            self.theme, self.size = theme, size
+
+        # built lazily, so random palettes only get sprites for colors in use
+        sprite = self.sprites.get(idx)
+        if sprite is None:
+            sprite = self.sprites[idx] = self.build(theme.get_color("figures", idx), size)
+
+        return sprite
+
+    def ghost(self, theme: Theme, idx: int, size: int) -> pg.Surface:
+        # the block faded, drawn where the figure would land
+        sprite = self.get(theme, idx, size)
+        ghost = self.ghosts.get(idx)
+        if ghost is None:
+            ghost = self.ghosts[idx] = sprite.copy()
+            ghost.set_alpha(70)
+
+        return ghost
+
+    @staticmethod
+    def build(color: Color, size: int) -> pg.Surface:
+        sprite = pg.Surface((size, size))
+        draw_block(sprite, color, 0, 0, size - 1, size - 1)
+        return sprite.convert() if pg.display.get_surface() is not None else sprite
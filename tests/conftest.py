@@ -0,0 +1,14 @@
+import os, sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest
+
+@pytest.fixture
+def root(monkeypatch):
+    # themes and assets are loaded relative to the repository
+    monkeypatch.chdir(ROOT)
+    return ROOT
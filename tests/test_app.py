@@ -0,0 +1,15 @@
+import pygame as pg
+
+from app import App
+
+def test_uncapped():
+    app = App('test', 100, 100, fps=0)
+    try:
+        assert app.profiler.budget is None
+
+        app.profiler.begin()
+        app.profiler.mark('draw')
+        app.profiler.end()
+        assert app.profiler.missed == 0
+    finally:
+        pg.quit()
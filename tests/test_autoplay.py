@@ -0,0 +1,66 @@
+from random import Random
+
+import pytest
+
+from autoplay import BeamSearch, drops
+from figure import Figure, SHAPES
+from grid import BitGrid, Grid
+
+def board(cls: type[Grid], seed: int) -> Grid:
+    random, g = Random(seed), cls(10, 20)
+    for j in range(12, 20):
+        gap = random.randrange(10)
+        for i in range(10):
+            if i != gap and random.random() < 0.8:
+                g.set(i, j, 1)
+    return g
+
+@pytest.mark.parametrize('cls', [Grid, BitGrid])
+@pytest.mark.parametrize('seed', range(5))
+def test_children_match_grid(cls, seed):
+    # the bitmask boards of the search agree with placing the figure on a copy of the grid
+    g, search = board(cls, seed), BeamSearch()
+    heights = g.heights[:]
+    root = (0., 0., g.occupied[:], heights, sum(heights), sum(abs(a - b) for a, b in zip(heights, heights[1:])),
+            sum(heights) - g.holes, g.zobrist, None)
+
+    for kind in range(len(SHAPES)):
+        figure = Figure(kind, 0, 5, 1)
+        placements = search.search.placements(g, figure)
+        moves = [(p, p.y, *drops(g.width, kind, p.rotation)[p.x]) for p in placements]
+        for child in search.expand(g, root, moves):
+            p = child[8]
+            n = g.copy()
+            n.burn(p.x, p.y, SHAPES[kind].coords[p.rotation], kind + 1)
+            lines = n.break_lines()
+
+            w, heights = search.weights, n.heights
+            bumpiness = sum(abs(a - b) for a, b in zip(heights, heights[1:]))
+            value = w.lines * lines + w.height * sum(heights) + w.holes * n.holes + w.bumpiness * bumpiness
+            assert child[0] == pytest.approx(value)
+            assert (child[2], child[3], child[7]) == (n.occupied, n.heights, n.zobrist)
+
+def test_depth():
+    assert (BeamSearch(depth=0).depth, BeamSearch(depth=2).depth, BeamSearch(depth=5).depth) == (1, 2, 3)
+
+def test_best():
+    g = board(BitGrid, 0)
+    p = BeamSearch(width=8, depth=3).best(g, Figure(0, 0, 5, 1), 1)
+    assert p is not None and p.path[-1:]
+
+@pytest.mark.parametrize('seed', range(5))
+def test_drops_land(seed):
+    g, search = board(Grid, seed), BeamSearch()
+    heights = g.heights[:]
+    root = (0., 0., g.occupied[:], heights, sum(heights), 0, sum(heights) - g.holes, g.zobrist, None)
+
+    for kind in range(len(SHAPES)):
+        for rotation in range(SHAPES[kind].rotations):
+            coords = SHAPES[kind].coords[rotation]
+            for x, move in drops(g.width, kind, rotation).items():
+                child = next(search.expand(g, root, [(None, None, *move)]))
+                y = g.landing(x, -min(j for _, j in coords), coords)
+                n = g.copy()
+                n.burn(x, y, coords, 1)
+                n.break_lines()
+                assert (child[2], child[3]) == (n.occupied, n.heights)
@@ -0,0 +1,14 @@
+from container import FileWriter
+
+def test_writer_survives_errors(tmp_path):
+    writer = FileWriter()
+    writer.write(str(tmp_path / 'missing' / 'a.json'), '{}')
+    assert writer.flush(timeout=5)
+
+    # data that cannot be written is reported, the writer keeps going
+    writer.write(str(tmp_path / 'b.json'), None)
+    assert writer.flush(timeout=5)
+
+    writer.write(str(tmp_path / 'c.json'), '{"a": 1}')
+    assert writer.flush(timeout=5)
+    assert (tmp_path / 'c.json').read_text() == '{"a": 1}'
@@ -0,0 +1,46 @@
+from functools import reduce
+from random import Random
+
+import pytest
+
+from grid import BitGrid, Grid
+
+def rehash(g: Grid) -> int:
+    return reduce(lambda h, c: h ^ g._table[c[1]][c[0]], g.nonzero(), 0)
+
+@pytest.mark.parametrize('cls', [Grid, BitGrid])
+@pytest.mark.parametrize('height', [20, 200])
+def test_incremental_hash(cls, height):
+    random, g = Random(1), cls(10, height)
+    for n in range(3000):
+        g.set(random.randrange(10), random.randrange(height), random.randint(0, 7))
+        if n % 50 == 0:
+            for j in range(random.randrange(height), height):
+                for i in range(10):
+                    g.set(i, j, 1)
+            g.break_lines()
+            g = g.copy()
+        assert g.zobrist == rehash(g)
+
+def test_hash_distinguishes():
+    a, b = Grid(10, 200), Grid(10, 200)
+    a.set(3, 10, 1)
+    b.set(3, 74, 1)
+    assert a.zobrist != b.zobrist
+    assert Grid(10, 20).position_key(0, 0, 5, 1) != Grid(10, 22).position_key(0, 0, 5, 1)
+
+@pytest.mark.parametrize('cls', [Grid, BitGrid])
+def test_stats(cls):
+    random, g = Random(2), cls(10, 20)
+    for n in range(3000):
+        g.set(random.randrange(10), random.randrange(20), random.randint(0, 3))
+        if n % 40 == 0:
+            for j in range(random.randrange(20), 20):
+                for i in range(10):
+                    g.set(i, j, 1)
+            g.break_lines()
+
+        heights = [next((g.height - j for j in range(g.height) if g.get(i, j) > 0), 0) for i in range(g.width)]
+        assert g.heights == heights
+        assert g.max_height == max(heights)
+        assert g.holes == sum(heights) - sum(1 for _ in g.nonzero())
@@ -0,0 +1,22 @@
+import random
+
+import pytest
+
+from highscores import HighScores
+
+@pytest.fixture
+def scores(tmp_path):
+    HighScores.close()
+    HighScores._filename = str(tmp_path / 'scores.db')
+    yield HighScores
+    HighScores.close()
+
+def test_rank(scores):
+    r = random.Random(1)
+    values = [r.randrange(0, 5 * HighScores.BUCKET) for _ in range(2000)]
+    scores.add_items([{"name": f"p{i}", "score": v, "date": ""} for i, v in enumerate(values)])
+    scores.compact(keep=500)
+
+    kept = [s for s, in scores._connect().execute("SELECT score FROM scores")]
+    for score in [0, 1, 999, 1000, 1001, 2500, 4999, 6000] + r.sample(kept, 20):
+        assert scores.rank(score) == sum(s > score for s in kept) + 1
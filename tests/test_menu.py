@@ -0,0 +1,47 @@
+import pytest
+
+from highscores import HighScores
+from menu import BaseMenu, HighScoresMenu, MenuItem
+
+@pytest.fixture
+def scores(tmp_path, monkeypatch):
+    HighScores.close()
+    monkeypatch.setattr(HighScores, '_filename', str(tmp_path / 'scores.db'))
+    monkeypatch.setattr(HighScores, '_legacy', str(tmp_path / 'scores.dat'))
+    HighScores.add_items([{"name": f"p{i}", "score": i, "date": ""} for i in range(10000)])
+    yield HighScores
+    HighScores.close()
+
+def test_highscores_window(scores):
+    menu = HighScoresMenu()
+    assert menu.count() == 10001
+
+    rows = menu.rows(menu.window(5))
+    assert [r.title for r in rows] == ["Back", "P9999 : 9999", "P9998 : 9998", "P9997 : 9997", "P9996 : 9996"]
+
+    menu.index = 5000
+    window = menu.window(5)
+    assert [r.title for r in menu.rows(window)] == [f"P{10000 - i} : {10000 - i}" for i in window]
+
+    scores.add_item(name="new", score=20000)
+    assert menu.count() == 10002
+    assert menu.rows(range(1, 2))[0].title == "NEW : 20000"
+
+def test_build_once():
+    # building may change the version, that must not cause a second build
+    class Menu(BaseMenu):
+        builds = 0
+        loaded = 0
+
+        def version(self) -> int:
+            return Menu.loaded
+
+        def build(self) -> list[MenuItem]:
+            Menu.builds += 1
+            Menu.loaded += 1
+            return [MenuItem("Back", "quit")]
+
+    menu = Menu()
+    menu.items()
+    menu.items()
+    assert Menu.builds == 1
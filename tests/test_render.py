@@ -0,0 +1,66 @@
+import pygame as pg
+import pytest
+
+from component import BaseComponent
+from consts import Action
+
+@pytest.fixture
+def screen(root):
+    pg.display.init()
+    pg.font.init()
+    BaseComponent.screen = pg.display.set_mode((400, 600))
+    yield BaseComponent.screen
+    pg.quit()
+
+def test_random_theme(screen):
+    from tetris import Tetris
+
+    t = Tetris(10, 20, seed=1)
+    t.set_theme('assets/random.theme')
+    t.reset()
+    for _ in range(20):
+        t.act(Action.DROP)
+        t.draw()
+
+    # random colors are generated once per figure and then kept
+    colors = t.theme.data['colors']['figures']
+    assert t.theme.get_color('figures', 0) == colors[0] == t.theme.get_color('figures', 0)
+
+def test_unknown_font_source(root, tmp_path):
+    import json
+    from theme import Theme
+
+    data = json.load(open('assets/default.theme'))
+    data['fonts']['defs']['normal']['source'] = 'missing'
+    source = tmp_path / 'bad.theme'
+    source.write_text(json.dumps(data))
+
+    # fails when the theme is loaded, not when the font is first drawn
+    with pytest.raises(ValueError):
+        Theme(str(source))
+
+def test_reload_broken_theme(root, tmp_path, capsys):
+    import json, os
+    from theme import ThemeRegistry
+
+    data = json.load(open('assets/default.theme'))
+    source = tmp_path / 'reload.theme'
+    source.write_text(json.dumps(data))
+    theme = ThemeRegistry.get(str(source))
+    loaded, version = theme.data, theme.version
+
+    broken = [dict(data, fonts={**data['fonts'], 'defs': {'normal': {'source': 'missing', 'size': 20}}}),
+              {k: v for k, v in data.items() if k != 'colors'}, '{']
+    for i, b in enumerate(broken):
+        source.write_text(b if isinstance(b, str) else json.dumps(b))
+        os.utime(source, ns=(i, i))
+
+        # the error is reported and the running theme keeps its data
+        assert ThemeRegistry.poll() == []
+        assert theme.data is loaded and theme.version == version
+        assert 'error:' in capsys.readouterr().out
+
+    source.write_text(json.dumps(data))
+    os.utime(source, ns=(10, 10))
+    assert ThemeRegistry.poll() == [theme] and theme.version == version + 1
+    ThemeRegistry._themes.pop(str(source))
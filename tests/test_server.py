@@ -0,0 +1,67 @@
+import asyncio, json
+
+from consts import State
+from server import Server
+
+async def connect(server: Server, hello: bytes) -> tuple[asyncio.StreamReader, asyncio.StreamWriter, dict]:
+    s = await server.serve(port=0)
+    reader, writer = await asyncio.open_connection('127.0.0.1', s.sockets[0].getsockname()[1])
+    writer.write(hello)
+    return reader, writer, json.loads(await reader.readline())
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            for task in asyncio.all_tasks() - {asyncio.current_task()}:
+                task.cancel()
+    return asyncio.run(main())
+
+def test_hello_must_be_an_object():
+    async def main():
+        for hello in (b'[]\n', b'1\n', b'nonsense\n'):
+            reader, writer, message = await connect(Server(), hello)
+            assert message['type'] == 'error'
+            assert await reader.read() == b''
+            writer.close()
+    run(main())
+
+def test_seeds():
+    async def main():
+        _, writer, message = await connect(Server(), b'{"seed": 5}\n')
+        assert message['type'] == 'start' and message['seed'] != 5
+        writer.close()
+
+        _, writer, message = await connect(Server(client_seeds=True), b'{"seed": 5}\n')
+        assert message['seed'] == 5
+        writer.close()
+    run(main())
+
+def test_finished_sessions_are_removed():
+    async def main():
+        server = Server(tps=1000)
+        reader, writer, _ = await connect(server, b'{}\n')
+        writer.write(b'{"action": "drop"}\n' * 200)
+
+        while (m := json.loads(await reader.readline()))['state'] != State.GAMEOVER:
+            pass
+        assert not server.sessions
+
+        # the server closes the connection after the final state
+        assert await asyncio.wait_for(reader.read(), 5) == b''
+        writer.close()
+    run(main())
+
+def test_empty_hello_and_bad_actions():
+    async def main():
+        server = Server(tps=1000)
+        reader, writer, message = await connect(server, b'\n')
+        assert message['type'] == 'start'
+
+        # unknown or malformed actions are skipped, the session keeps going
+        writer.write(b'{"action": ["x"]}\n{"action": {}}\n[]\n{"action": "nope"}\n' + b'{"action": "drop"}\n' * 200)
+        while (m := json.loads(await reader.readline()))['state'] != State.GAMEOVER:
+            pass
+        writer.close()
+    run(main())
@@ -1,204 +1,290 @@
-import copy
-from dataclasses import dataclass, field
-from itertools import count
+import atexit, os, random, time
 import pygame as pg
-from random import randint
+from typing import TYPE_CHECKING
 
+from autoplay import BeamSearch
 from component import BaseComponent
-from consts import AppCode, DrawCode, State
+from consts import Action, AppCode, DrawCode, Event, State
+from engine import Engine, gravity
+from figure import Figure
 from grid import Grid
-from theme import Color
-
-@dataclass
-class Figure:
-    rotations: int
-    icoords: list[tuple]
-    color: int = field(default_factory=count().__next__)
-    x: int = 0
-    y: int = 0
-    rotation: int = 0
-
-    def __post_init__(self):
-        self.coords: list[tuple] = copy.copy(self.icoords)
-
-    def rotate(self, rotation):
-        self.coords = copy.copy(self.icoords)
-
-        if rotation > 0:
-            for r in range(rotation):
-                for i in range(1, len(self.coords)):
-                    x = self.coords[i][1]
-                    y = self.coords[i][0]
-                    self.coords[i] = (-x, y)
-
-        return self.coords
-
-FIGURES = [
-    Figure(2, [(0, 0), (0, -1), (0, 1), (0, 2)]),
-    Figure(4, [(0, 0), (0, -1), (0, 1), (1, 1)]),
-    Figure(4, [(0, 0), (0, -1), (0, 1), (-1, 1)]),
-    Figure(4, [(0, 0), (0, -1), (-1, 0), (1, 0)]),
-    Figure(2, [(0, 0), (0, -1), (1, 0), (1, 1)]),
-    Figure(2, [(0, 0), (0, -1), (-1, 0), (-1, 1)]),
-    Figure(1, [(0, 0), (1,  0), (1, 1), (0, 1)])
-]
+from renderer import Renderer
+from search import Placement
+from replay import ReplayWriter, load
+from snapshot import UndoBuffer
+from sprites import SpriteAtlas
+from theme import Theme
+
+if TYPE_CHECKING:
+    from dataset import TransitionWriter
+
+KEYS = {
+    pg.K_UP: Action.ROTATE,
+    pg.K_DOWN: Action.DOWN,
+    pg.K_LEFT: Action.LEFT,
+    pg.K_RIGHT: Action.RIGHT,
+    pg.K_SPACE: Action.DROP,
+    pg.K_p: Action.PAUSE
+}
+
+UNDO = pg.K_BACKSPACE
 
 class Tetris(BaseComponent):
     x: int = 90
     y: int = 40
     size: int = 26
-    figure: Figure
+    ghost: bool = True
+    engine: Engine
 
-    def __init__(self, width, height, size=25):
+    def __init__(self, width, height, size=25, seed: int|None = None, record: str|None = None, export: str|None = None):
         self.width = width
         self.height = height
         self.size = size
-
-    def set_theme(self, source: str):
-        super().set_theme(source)
-
-        self.texts = {
-            State.PAUSE: self.theme.get_font("large").render("GAME PAUSED", True, self.theme.get_color("text")),
-            State.GAMEOVER: self.theme.get_font("normal").render("Game over!", True, self.theme.get_color("text")),
-            State.GAMEOVER + 1: self.theme.get_font("large").render("Press ESC", True, self.theme.get_color("text"))
-        }
+        self.seed = seed
+        self.record = record
+        self.recorder: ReplayWriter|None = None
+        self.export = export
+        self.exporter: 'TransitionWriter|None' = None
+        self.clock = 0.
+        self.engine = Engine(width, height, seed)
+        self.renderer = Renderer(self)
+        self.sprites = SpriteAtlas()
+        self.rects: list[pg.Rect]|None = None
+        self.theme = Theme()
+        self.undo = UndoBuffer()
+
+    @property
+    def grid(self) -> Grid:
+        return self.engine.grid
+
+    @property
+    def figure(self) -> Figure:
+        return self.engine.figure
+
+    @property
+    def nextfigure(self) -> Figure:
+        return self.engine.nextfigure
+
+    @property
+    def state(self) -> State:
+        return self.engine.state
+
+    @property
+    def score(self) -> int:
+        return self.engine.score
+
+    @property
+    def level(self) -> int:
+        return self.engine.level
+
+    def set_theme(self, source: str) -> bool:
+        if not super().set_theme(source):
+            return False
+
+        self.sprites.invalidate()
+        self.renderer.invalidate()
+        return True
 
     def reset(self):
-        self.state = State.START
-        self.grid = Grid(self.width, self.height)
-
-        self.score = 0
-        self.level = 1
-
-        self.nextfigure = self.create_figure()
-        self.next_figure()
-
-    def get_time_scaling(self) -> int:
-        return self.level
-
-    def create_figure(self) -> Figure:
-        return copy.deepcopy(FIGURES[randint(0, len(FIGURES) - 1)])
-
-    def next_figure(self):
-        if self.state == State.GAMEOVER:
-            return
-
-        self.figure = copy.deepcopy(self.nextfigure)
-        self.figure.x = self.grid.width // 2
-        self.figure.y = 1
-        self.nextfigure = self.create_figure()
+        self.elapsed = self.clock = 0.
+
+        # every game gets a concrete seed, so it can be replayed
+        self.engine.seed = self.seed if self.seed is not None else random.getrandbits(32)
+        self.engine.reset()
+        self.renderer.invalidate()
+        self.undo.clear()
+        self.undo.push(self.engine.snapshot())
+
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.record is not None:
+            os.makedirs(self.record, exist_ok=True)
+            self.recorder = ReplayWriter(os.path.join(self.record, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.engine.seed}.rpl"),
+                                         self.width, self.height, self.engine.seed)
+
+        if self.exporter is not None:
+            self.exporter.end()
+        elif self.export is not None:
+            # numpy is only needed when exporting
+            from dataset import TransitionWriter
+            self.exporter = TransitionWriter(self.export, self.width, self.height)
+            atexit.register(self.exporter.close)
+
+    def tick(self, ms: float):
+        self.clock += ms
+        super().tick(ms)
+
+    def act(self, action: Action) -> list[Event]:
+        if self.recorder is not None:
+            self.recorder.write(int(self.clock), action)
+
+        events = self.exporter.step(self.engine, action) if self.exporter is not None else self.engine.step(action)
+        if Event.GAMEOVER in events and self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        elif Event.SPAWN in events:
+            self.undo.push(self.engine.snapshot())
+
+        return events
+
+    def rewind(self) -> bool:
+        # back to the start of the current piece, or of the one before when it has not moved yet
+        s, f = self.undo.pop(), self.figure
+        if s is not None and len(self.undo) and (s.pieces, s.figure) == (self.engine.pieces, (f.kind, f.rotation, f.x, f.y)):
+            s = self.undo.pop()
+        if s is None:
+            return False
+
+        if self.exporter is not None:
+            self.exporter.end()
+
+        self.engine.restore(s)
+        self.undo.push(s)
+        self.renderer.invalidate()
+        self.elapsed = 0.
+        return True
 
-        if self.grid.intersects(self.figure.x, self.figure.y, self.figure.coords):
-            self.state = State.GAMEOVER
+    def get_gravity(self) -> float:
+        return gravity(self.level)
 
     def update(self):
-        if self.figure is None:
-            self.next_figure()
-
-        match self.state:
-            case State.START:
-                self.state = State.RUNNING
-            case State.PAUSE:
-                return
-
-        self.down()
-
-    def drop(self):
-        while self.down():
-            pass
-
-    def down(self):
-        if self.grid.intersects(self.figure.x, self.figure.y + 1, self.figure.coords):
-            return self.freeze() and False
-        else:
-            self.score += 1
-            self.figure.y += 1
-            return True
-
-    def freeze(self):
-        self.grid.burn(self.figure.x, self.figure.y, self.figure.coords, self.figure.color + 1)
-        self.score += (self.grid.break_lines() ** 2) * 100
-
-        self.next_figure()
-
-    def side(self, dx):
-        if not self.grid.intersects(self.figure.x + dx, self.figure.y, self.figure.coords):
-            self.figure.x += dx
-
-    def rotate(self):
-        rotation = (self.figure.rotation + 1) % self.figure.rotations
-
-        if not self.grid.intersects(self.figure.x, self.figure.y, self.figure.rotate(rotation)):
-            self.figure.rotation = rotation
-        else:
-            self.figure.rotate(self.figure.rotation)
+        self.act(Action.TICK)
 
     def handle_key(self, key: int) -> int:
+        # undo would make a recorded replay diverge
+        if key == UNDO and self.recorder is None:
+            self.rewind()
+            return AppCode.OK
+
         if self.state == State.GAMEOVER:
             return AppCode.OK
 
-        if key == pg.K_UP:
-            self.rotate()
-        elif key == pg.K_DOWN:
-            self.down()
-        elif key == pg.K_LEFT:
-            self.side(-1)
-        elif key == pg.K_RIGHT:
-            self.side(1)
-        elif key == pg.K_SPACE:
-            self.drop()
-        elif key == pg.K_p:
-            self.state = State.PAUSE if self.state == State.RUNNING else State.RUNNING
-        else:
+        if key not in KEYS:
             return AppCode.UNHANDLED
 
+        self.act(KEYS[key])
+
         return AppCode.OK
 
-    def draw_block(self, color: Color, x: int, y: int, w: int, h: int):
-        pg.draw.rect(BaseComponent.screen, color, (x, y, w, h))
-        pg.draw.line(BaseComponent.screen, color.lighten(0.5), (x, y), (x, y + h))
-        pg.draw.line(BaseComponent.screen, color.lighten(0.5), (x, y), (x + w, y))
-        pg.draw.line(BaseComponent.screen, color.darken(0.5), (x + w, y), (x + w, y + h))
-        pg.draw.line(BaseComponent.screen, color.darken(0.5), (x, y + h), (x + w, y + h))
+    def sprite(self, c: int) -> pg.Surface:
+        return self.sprites.get(self.theme, c, self.size)
 
-    def draw_figure(self, figure, x, y):
-        for i, j in figure.coords:
-            self.draw_block(self.theme.get_color("figures", figure.color),
-                            x + self.size * (i + figure.x) + 1, y + self.size * (j + figure.y) + 1, self.size - 1, self.size - 1)
+    def cell(self, i: int, j: int, x: int|None = None, y: int|None = None) -> tuple[int, int]:
+        return ((self.x if x is None else x) + self.size * i + 1, (self.y if y is None else y) + self.size * j + 1)
 
-    def draw(self) -> bool:
-        BaseComponent.screen.fill(self.theme.get_color("background"))
+    def draw_cells(self, cells: list[tuple[int, int, int]], surface: pg.Surface):
+        surface.blits([(self.sprite(c - 1), self.cell(i, j)) for i, j, c in cells], False)
 
-        # draw grid
-        for i in range(self.grid.height + 1):
-            pg.draw.line(BaseComponent.screen, self.theme.get_color("line"),
-                         (self.x, self.y + self.size * i), (self.x + self.size * self.grid.width, self.y + self.size * i))
-        for j in range(self.grid.width + 1):
-            pg.draw.line(BaseComponent.screen, self.theme.get_color("line"),
-                         (self.x + self.size * j, self.y), (self.x + self.size * j, self.y + self.size * self.grid.height))
+    def draw_figure(self, figure, x, y):
+        sprite = self.sprite(figure.color)
+        BaseComponent.screen.blits([(sprite, self.cell(i + figure.x, j + figure.y, x, y)) for i, j in figure.coords], False)
 
-        # fill non-zero
-        for i, j, c in self.grid.nonzero():
-            self.draw_block(self.theme.get_color("figures", c - 1),
-                            self.x + self.size * i + 1, self.y + self.size * j + 1, self.size - 1, self.size - 1)
+    def draw_ghost(self, figure, y):
+        sprite = self.sprites.ghost(self.theme, figure.color, self.size)
+        BaseComponent.screen.blits([(sprite, self.cell(i + figure.x, j + y)) for i, j in figure.coords], False)
 
-        # fill current and next figure
-        self.draw_figure(self.figure, self.x, self.y)
-        self.draw_figure(self.nextfigure, 30, 50)
+    def draw(self) -> bool:
+        self.rects = self.renderer.draw()
+        return True
 
-        return self.draw_texts()
+    def get_dirty_rects(self) -> list[pg.Rect]|None:
+        return self.rects
 
     def draw_texts(self) -> bool:
         # render level and score
         self.draw_text(f"Level: {self.level:2}  Score: {self.score}",
                        DrawCode.CENTER, BaseComponent.screen.get_height() - 30, self.theme.get_color("text"))
 
-        # display game over texts
+        # display game over texts, rendered on first use
         match self.state:
             case State.PAUSE:
-                self.draw_text(self.texts[State.PAUSE], DrawCode.CENTER, DrawCode.CENTER)
+                self.draw_text("GAME PAUSED", DrawCode.CENTER, DrawCode.CENTER, self.theme.get_color("text"), "large")
             case State.GAMEOVER:
-                self.draw_text(self.texts[State.GAMEOVER], DrawCode.CENTER, 20)
-                self.draw_text(self.texts[State.GAMEOVER + 1], DrawCode.CENTER, DrawCode.CENTER)
+                self.draw_text("Game over!", DrawCode.CENTER, 20, self.theme.get_color("text"))
+                self.draw_text("Press ESC", DrawCode.CENTER, DrawCode.CENTER, self.theme.get_color("text"), "large")
 
         return True
+
+class ReplayPlayer(Tetris):
+    speeds = {pg.K_1: 1, pg.K_2: 4, pg.K_3: 16}
+
+    def __init__(self, source: str, speed: int = 1, size=25):
+        header, self.actions = load(source)
+        super().__init__(header.width, header.height, size, header.seed)
+        self.speed = speed
+        self.index = 0
+
+    def reset(self):
+        super().reset()
+        self.index = 0
+
+    def tick(self, ms: float):
+        self.clock += ms * self.speed
+        while self.index < len(self.actions) and self.actions[self.index][0] <= self.clock:
+            self.engine.step(self.actions[self.index][1])
+            self.index += 1
+
+    def handle_key(self, key: int) -> int:
+        if key in self.speeds:
+            self.speed = self.speeds[key]
+            return AppCode.OK
+
+        return AppCode.UNHANDLED
+
+class AutoPlayer(Tetris):
+    # share of a frame the search may take, it runs once per piece and drawing needs the rest
+    share = 0.75
+
+    def __init__(self, width, height, size=25, seed: int|None = None, beam: int = 16, depth: int = 3,
+                 budget: float|None = None, rate: float = 50.):
+        super().__init__(width, height, size, seed)
+        # budget is the frame budget of the app, without one the search is only bounded by its width and depth
+        self.planner = BeamSearch(beam, depth, budget=budget * self.share if budget is not None else None)
+        self.rate = rate
+        self.moves = 0.
+        self.target: Placement|None = None
+        self.piece = -1
+
+    def reset(self):
+        super().reset()
+        self.moves = 0.
+        self.target = None
+        self.piece = -1
+
+    def tick(self, ms: float):
+        super().tick(ms)
+
+        self.moves += ms
+        while self.moves >= self.rate:
+            self.moves -= self.rate
+            if self.state == State.RUNNING:
+                self.act(self.next_action())
+
+    def next_action(self) -> Action:
+        if self.piece != self.engine.pieces:
+            self.piece = self.engine.pieces
+            self.target = None
+
+        # gravity may have moved the figure, so follow the path from where it is now
+        for _ in range(2):
+            if self.target is None:
+                self.target = self.planner.best(self.grid, self.figure, self.nextfigure.kind)
+                if self.target is None:
+                    return Action.DROP
+
+            t = self.target
+            for p in self.planner.search.placements(self.grid, self.figure):
+                if (p.x, p.y, p.rotation) == (t.x, t.y, t.rotation):
+                    return p.path[0]
+
+            # the target can no longer be reached, plan again
+            self.target = None
+
+        return Action.DROP
+
+    def handle_key(self, key: int) -> int:
+        if KEYS.get(key) == Action.PAUSE:
+            self.act(Action.PAUSE)
+            return AppCode.OK
+
+        return AppCode.UNHANDLED
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-import json
+import json, os
 from random import randrange
 from typing import NewType
 
@@ -20,15 +20,17 @@ class Color(tuple):
 
 class RandomColors(dict):
     def __getitem__(self, __key: int) -> Color:
-        if not __key in self:
-            self[__key] = Color.generate()
+        # generated on first use and kept, so a figure keeps its color
+        if __key not in self:
+            dict.__setitem__(self, __key, Color.generate())
 
-        return self[__key]
+        return dict.__getitem__(self, __key)
 
 @dataclass
 class Theme:
     source: str = ""
     data: dict = field(default_factory=dict)
+    version: int = 0
 
     def __post_init__(self):
         self.load_theme()
@@ -39,26 +41,88 @@ class Theme:
 
         try:
             with open(self.source, 'r') as f:
-                self.data = json.loads(f.read())
+                data = json.loads(f.read())
         except IOError as e:
             print(f"error: {e}")
+            return
         except json.JSONDecodeError as e:
             print(f"error: json: {e}")
-
-        if not len(self.data):
             return
 
-        # process color defs
-        if self.data['colors']['figures'] == "random":
-            self.data['colors']['figures'] = RandomColors()
+        # checked before it replaces the current data, a broken file keeps the old theme
+        self.data = self.parse(data)
+        self.version += 1
+
+    def parse(self, data: dict) -> dict:
+        try:
+            # process color defs
+            if data['colors']['figures'] == "random":
+                data['colors']['figures'] = RandomColors()
+
+            # fonts are loaded on first use, but a def without a known source is an error now
+            for name, df in data['fonts']['defs'].items():
+                if df['source'] not in data['fonts']['files']:
+                    raise ValueError(f"{self.source}: font {name}: unknown source {df['source']}")
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"{self.source}: missing or invalid {e}") from e
 
-        # process font definitions
-        for name, df in self.data['fonts']['defs'].items():
-            if df['source'] in self.data['fonts']['files']:
-                self.data['fonts']['defs'][name]['_font'] = pg.font.Font('assets/' + self.data['fonts']['files'][df['source']], df['size'])
+        return data
 
     def get_color(self, name: str, idx: int|None = None) -> Color:
         return Color(self.data.get('colors', {})[name] if idx is None else self.data.get('colors', {})[name][idx])
 
     def get_font(self, name: str) -> pg.font.Font:
-        return self.data.get('fonts', {})['defs'][name]['_font']
\ No newline at end of file
+        # fonts are loaded on first use
+        df = self.data.get('fonts', {})['defs'][name]
+        if '_font' not in df:
+            df['_font'] = ThemeRegistry.font('assets/' + self.data['fonts']['files'][df['source']], df['size'])
+
+        return df['_font']
+
+class ThemeRegistry:
+    # every theme is loaded once per process and shared by all components
+    _themes: dict[str, Theme] = {}
+    _mtimes: dict[str, int|None] = {}
+    _fonts: dict[tuple[str, int], pg.font.Font] = {}
+
+    @classmethod
+    def get(cls, source: str) -> Theme:
+        theme = cls._themes.get(source)
+        if theme is None:
+            cls._mtimes[source] = cls._mtime(source)
+            theme = cls._themes[source] = Theme(source)
+
+        return theme
+
+    @classmethod
+    def font(cls, filename: str, size: int) -> pg.font.Font:
+        font = cls._fonts.get((filename, size))
+        if font is None:
+            font = cls._fonts[(filename, size)] = pg.font.Font(filename, size)
+
+        return font
+
+    @classmethod
+    def poll(cls) -> list[Theme]:
+        # reloads changed themes in place, so holders of a theme see the new data
+        changed = []
+        for source, theme in cls._themes.items():
+            mtime = cls._mtime(source)
+            if mtime != cls._mtimes[source]:
+                cls._mtimes[source] = mtime
+                version = theme.version
+                try:
+                    theme.load_theme()
+                except ValueError as e:
+                    print(f"error: {e}")
+                if theme.version != version:
+                    changed.append(theme)
+
+        return changed
+
+    @staticmethod
+    def _mtime(source: str) -> int|None:
+        try:
+            return os.stat(source).st_mtime_ns
+        except OSError:
+            return None
\ No newline at end of file